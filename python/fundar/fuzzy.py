@@ -1,5 +1,12 @@
 from .utils import mapper, Mapper, Range, Indexable, BoundedInt, BoundedFloat, Max
-from typing import TypeVar
+from .parallelization import Executor, Multiprocess, ProcessPool
+from typing import TypeVar, Callable, Iterable, Iterator
+from collections import Counter
+from itertools import combinations
+import zlib
+from os import cpu_count
+from functools import partial
+import numpy as np
 
 A = TypeVar('A')
 B = TypeVar('B')
@@ -63,7 +70,66 @@ def levenshtein_distance(a: Indexable[A], b: Indexable[A]) -> BoundedInt[0, Max[
     # The bottom-right cell contains the minimum edit distance
     return matrix[n][m]
 
-def normalized_levenshtein_similarity(a: Indexable[A], b: Indexable[A], mapper: Mapper[[Range[N, M]], ...] = None) -> BoundedFloat[N, M]:
+def bounded_levenshtein_distance(a: Indexable[A], b: Indexable[A], max_distance: int) -> BoundedInt[0, Max[N, M]]:
+    """
+    Calcula la distancia de Levenshtein entre dos elementos sólo si es a lo sumo max_distance.
+    Usa la programación dinámica en banda de Ukkonen: sólo se calculan las celdas a distancia
+    <= max_distance de la diagonal, con dos filas del largo del elemento más corto, y se corta
+    apenas toda la banda de una fila supera max_distance.
+    Tiempo O(max_distance * min(N, M)), memoria O(min(N, M)).
+
+    Args:
+        a: Indexable[A], donde len(a) = N
+        b: Indexable[A], donde len(b) = M
+        max_distance: int
+        resultado: BoundedInt[0, max_distance + 1]
+            La distancia si es <= max_distance, o max_distance + 1 si la supera.
+    """
+    if max_distance < 0:
+        raise ValueError("'max_distance' must be a non-negative integer.")
+
+    if len(a) > len(b):
+        a, b = b, a
+
+    n = len(a)
+    m = len(b)
+    k = max_distance
+    exceeded = k + 1
+
+    if m - n > k:
+        return exceeded
+
+    previous = [j if j <= k else exceeded for j in range(n + 1)]
+    current = [exceeded] * (n + 1)
+
+    for i in range(1, m + 1):
+        lo = max(1, i - k)
+        hi = min(n, i + k)
+        current[lo - 1] = min(i, exceeded) if lo == 1 else exceeded
+        row_min = current[lo - 1]
+        bi = b[i - 1]
+
+        for j in range(lo, hi + 1):
+            cost = 0 if a[j - 1] == bi else 1
+            value = min(
+                previous[j] + 1,  # deletion
+                current[j - 1] + 1,  # insertion
+                previous[j - 1] + cost  # substitution
+            )
+            current[j] = value if value <= k else exceeded
+            row_min = min(row_min, current[j])
+
+        if hi < n:
+            current[hi + 1] = exceeded
+
+        if row_min > k:
+            return exceeded
+
+        previous, current = current, previous
+
+    return previous[n]
+
+def normalized_levenshtein_similarity(a: Indexable[A], b: Indexable[A], mapper: Mapper[[Range[N, M]], ...] = None, min_similarity: float = None) -> BoundedFloat[N, M]:
     """
     Calcula la distancia de Levenshtein entre dos elementos y la normaliza en un rango.
     Si se usa el rango predefinido, el resultado estará en el rango [0, 1].
@@ -71,19 +137,41 @@ def normalized_levenshtein_similarity(a: Indexable[A], b: Indexable[A], mapper:
         0 significa que las cadenas son completamente distintas.
         1 significa que las cadenas son exactamente iguales.
 
+    Si se indica min_similarity, la distancia se calcula con bounded_levenshtein_distance y se corta
+    apenas la similitud no puede alcanzar ese valor; en ese caso el resultado es el extremo inferior
+    del rango (0 con el rango predefinido). Requiere un mapper que decrezca con la distancia.
+
     Args:
         a: Indexable[A]
         b: Indexable[B]
         mapper: Mapper[[N, M], ...], default = None
+        min_similarity: BoundedFloat[N, M], default = None
         resultado: BoundedFloat[N, M]
     """
     mapper = mapper or inverse_normaliser
     
     max_len = max(len(a), len(b))
-    distance = levenshtein_distance(a,b)
+
+    if min_similarity is None:
+        distance = levenshtein_distance(a,b)
+        return mapper(distance, 0, max_len)
+
+    lowest = mapper(max_len, 0, max_len)
+    highest = mapper(0, 0, max_len)
+    if highest <= lowest:
+        raise ValueError("'min_similarity' requires a mapper that decreases with the distance.")
+
+    # Los mappers son lineales: se despeja la distancia máxima que todavía alcanza min_similarity.
+    max_distance = int(np.floor((highest - min_similarity) / (highest - lowest) * max_len + 1e-9))
+    if max_distance < 0:
+        return lowest
+
+    distance = bounded_levenshtein_distance(a, b, min(max_distance, max_len))
+    if distance > max_distance:
+        return lowest
+
     normalised_distance = mapper(distance, 0, max_len)
-    
-    return normalised_distance
+    return normalised_distance if normalised_distance >= min_similarity else lowest
 
 def jaccard_similarity(a: set[A], b: set[A]) -> BoundedFloat[0, 1]:
     """
@@ -102,4 +190,748 @@ def jaccard_similarity(a: set[A], b: set[A]) -> BoundedFloat[0, 1]:
     """
     intersect_n = len(a & b)
     union_n = len(a | b)
-    return intersect_n / union_n
\ No newline at end of file
+    return intersect_n / union_n
+
+# =============================================================================================
+
+_WORD = 64
+_MAX_BLOCK_CELLS = 1 << 22
+_MAX_BITPARALLEL_CELLS = 1 << 16
+
+def _scorer_name(scorer) -> str | None:
+    match scorer:
+        case 'levenshtein' | 'normalized_levenshtein' | 'jaccard':
+            return scorer
+        case _ if scorer is levenshtein_distance:
+            return 'levenshtein'
+        case _ if scorer is normalized_levenshtein_similarity:
+            return 'normalized_levenshtein'
+        case _ if scorer is jaccard_similarity:
+            return 'jaccard'
+        case _ if callable(scorer):
+            return None
+        case _:
+            raise ValueError(f"Unknown scorer '{scorer}'.")
+
+def _encode(sequences: list) -> tuple[list[np.ndarray], int]:
+    """
+    Codifica cada secuencia como un arreglo de enteros en [0, alfabeto).
+    El alfabeto es compartido por todas las secuencias.
+    """
+    lengths = [len(s) for s in sequences]
+
+    if all(isinstance(s, str) for s in sequences):
+        flat = np.frombuffer(''.join(sequences).encode('utf-32-le'), dtype=np.uint32)
+        alphabet, ids = np.unique(flat, return_inverse=True)
+        alphabet_size = len(alphabet)
+    else:
+        vocabulary = {}
+        ids = np.fromiter((vocabulary.setdefault(x, len(vocabulary)) for s in sequences for x in s),
+                          dtype=np.int64, count=sum(lengths))
+        alphabet_size = len(vocabulary)
+
+    offsets = np.concatenate(([0], np.cumsum(lengths)))
+    return [ids[i:j] for i, j in zip(offsets[:-1], offsets[1:])], alphabet_size
+
+def _choice_blocks(codes: list[np.ndarray], pad: int, block_size: int):
+    """
+    Agrupa las elecciones ordenadas por longitud en bloques rellenados con `pad`,
+    para minimizar el relleno dentro de cada bloque.
+    Genera tuplas (índices, longitudes, matriz de códigos).
+    """
+    lengths = np.array([len(c) for c in codes], dtype=np.int64)
+    order = np.argsort(lengths, kind='stable')
+
+    for start in range(0, len(order), block_size):
+        indices = order[start:start + block_size]
+        block_lengths = lengths[indices]
+        block = np.full((len(indices), int(block_lengths.max(initial=0))), pad, dtype=np.int64)
+        for row, i in enumerate(indices):
+            block[row, :lengths[i]] = codes[i]
+        yield indices, block_lengths, block
+
+def _myers_distances(query_codes: list[np.ndarray], alphabet_size: int, block) -> np.ndarray:
+    """
+    Distancia de Levenshtein bit-paralela (Myers/Hyyrö) entre un lote de consultas de
+    longitud <= 64 y un bloque de elecciones. Todas las celdas de la matriz (elecciones x consultas)
+    avanzan en paralelo, un carácter de la elección por paso. Como el bloque está ordenado por
+    longitud, en el paso j sólo se actualizan las filas de las elecciones más largas que j.
+    """
+    indices, lengths, codes = block
+    one = np.uint64(1)
+
+    peq = np.zeros((alphabet_size + 1, len(query_codes)), dtype=np.uint64)
+    m = np.array([len(query) for query in query_codes], dtype=np.int64)
+    for q, query in enumerate(query_codes):
+        for i, c in enumerate(query):
+            peq[c, q] |= one << np.uint64(i)
+
+    mask = np.array([(1 << int(k)) - 1 for k in m], dtype=np.uint64)
+    shift = np.maximum(m - 1, 0).astype(np.uint64)
+
+    vp = np.tile(mask, (len(indices), 1))
+    vn = np.zeros_like(vp)
+    score = np.tile(m.astype(np.uint64), (len(indices), 1))
+    buffers = [np.empty_like(vp) for _ in range(5)]
+
+    for j in range(codes.shape[1]):
+        s = np.searchsorted(lengths, j, side='right')
+        v_p, v_n, sc = vp[s:], vn[s:], score[s:]
+        x, d0, hn, hp, t = (b[s:] for b in buffers)
+
+        peq.take(codes[s:, j], axis=0, out=x)
+        x |= v_n
+        np.bitwise_and(x, v_p, out=d0)
+        d0 += v_p
+        d0 ^= v_p
+        d0 |= x
+        np.bitwise_and(v_p, d0, out=hn)
+        np.bitwise_or(d0, v_p, out=hp)
+        np.invert(hp, out=hp)
+        hp |= v_n
+        np.right_shift(hp, shift, out=t)
+        t &= one
+        sc += t
+        np.right_shift(hn, shift, out=t)
+        t &= one
+        sc -= t
+        np.left_shift(hp, one, out=x)
+        x |= one
+        x &= mask
+        np.bitwise_and(x, d0, out=v_n)
+        np.bitwise_or(x, d0, out=t)
+        np.invert(t, out=t)
+        np.left_shift(hn, one, out=v_p)
+        v_p |= t
+        v_p &= mask
+
+    # Con una consulta vacía la distancia es la longitud de la elección.
+    return np.where(m[:, None] == 0, lengths[None, :], score.T.astype(np.int64))
+
+def _dp_distances(query: np.ndarray, block) -> np.ndarray:
+    """
+    Distancia de Levenshtein entre una consulta y un bloque de elecciones con programación dinámica
+    de dos filas. Cada fila se calcula de forma vectorizada: la dependencia horizontal (inserción)
+    se resuelve con un mínimo acumulado.
+    """
+    indices, lengths, codes = block
+    columns = np.arange(codes.shape[1] + 1)
+    previous = np.broadcast_to(columns, (len(indices), len(columns))).copy()
+    current = np.empty_like(previous)
+
+    for i, c in enumerate(query, start=1):
+        cost = codes != c
+        current[:, 0] = i
+        np.minimum(previous[:, 1:] + 1, previous[:, :-1] + cost, out=current[:, 1:])
+        current = np.minimum.accumulate(current - columns, axis=1) + columns
+        previous, current = current, previous
+
+    return previous[np.arange(len(indices)), lengths]
+
+def _levenshtein_matrix(query_codes, choice_codes, alphabet_size) -> Callable[[slice], np.ndarray]:
+    """
+    Prepara los bloques de elecciones una sola vez y devuelve una función que calcula
+    las distancias de un rango de consultas contra todas las elecciones.
+    """
+    bitparallel_blocks = list(_choice_blocks(choice_codes, alphabet_size, _MAX_BITPARALLEL_CELLS // 256))
+    dp_blocks = list(_choice_blocks(choice_codes, alphabet_size, _MAX_BITPARALLEL_CELLS // _WORD))
+    query_batch = max(1, min(256, _MAX_BLOCK_CELLS // (alphabet_size + 1)))
+
+    def distances(rows: slice) -> np.ndarray:
+        codes = query_codes[rows]
+        result = np.empty((len(codes), len(choice_codes)), dtype=np.int64)
+        short = [q for q in range(len(codes)) if len(codes[q]) <= _WORD]
+        long = [q for q in range(len(codes)) if len(codes[q]) > _WORD]
+
+        for start in range(0, len(short), query_batch):
+            batch = short[start:start + query_batch]
+            for block in bitparallel_blocks:
+                result[np.ix_(batch, block[0])] = _myers_distances([codes[q] for q in batch], alphabet_size, block)
+
+        for q in long:
+            for block in dp_blocks:
+                result[q, block[0]] = _dp_distances(codes[q], block)
+
+        return result
+    
+    return distances
+
+def _jaccard_matrix(queries, choices) -> Callable[[slice], np.ndarray]:
+    """
+    Construye un índice invertido (token -> elecciones que lo contienen) y devuelve una función
+    que calcula las similitudes de un rango de consultas contra todas las elecciones.
+    """
+    query_sets = [x if isinstance(x, (set, frozenset)) else set(x) for x in queries]
+    choice_sets = [x if isinstance(x, (set, frozenset)) else set(x) for x in choices]
+
+    vocabulary = {}
+    choice_ids = [np.fromiter((vocabulary.setdefault(x, len(vocabulary)) for x in s), dtype=np.int64, count=len(s))
+                  for s in choice_sets]
+    choice_sizes = np.array([len(s) for s in choice_sets], dtype=np.int64)
+
+    tokens = np.concatenate(choice_ids) if choice_ids else np.empty(0, dtype=np.int64)
+    owners = np.repeat(np.arange(len(choice_sets)), choice_sizes)
+    order = np.argsort(tokens, kind='stable')
+    postings = owners[order]
+    bounds = np.searchsorted(tokens[order], np.arange(len(vocabulary) + 1))
+
+    def similarities(rows: slice) -> np.ndarray:
+        sets = query_sets[rows]
+        result = np.empty((len(sets), len(choice_sets)), dtype=np.float64)
+        for q, s in enumerate(sets):
+            ids = [vocabulary[x] for x in s if x in vocabulary]
+            hits = np.concatenate([postings[bounds[i]:bounds[i + 1]] for i in ids]) if ids else postings[:0]
+            intersection = np.bincount(hits, minlength=len(choice_sets))
+            union = len(s) + choice_sizes - intersection
+            with np.errstate(invalid='ignore', divide='ignore'):
+                result[q] = np.where(union > 0, intersection / union, 1.0)
+        return result
+
+    return similarities
+
+def _score_matrix(name, scorer, queries: list, choices: list) -> Callable[[slice], np.ndarray]:
+    """
+    Devuelve una función que calcula la matriz de puntajes de un rango de consultas contra todas las
+    elecciones. Lo que no depende de las consultas (codificación, bloques, índices) se prepara una vez.
+    """
+    if name is None:
+        return lambda rows: np.array([[scorer(a, b) for b in choices] for a in queries[rows]])
+
+    if name == 'jaccard':
+        return _jaccard_matrix(queries, choices)
+
+    codes, alphabet_size = _encode(queries + choices)
+    query_codes, choice_codes = codes[:len(queries)], codes[len(queries):]
+    distances = _levenshtein_matrix(query_codes, choice_codes, alphabet_size)
+
+    if name == 'levenshtein':
+        return distances
+
+    query_lengths = np.array([len(q) for q in query_codes], dtype=np.int64)
+    choice_lengths = np.array([len(c) for c in choice_codes], dtype=np.int64)
+
+    def similarities(rows: slice) -> np.ndarray:
+        max_len = np.maximum.outer(query_lengths[rows], choice_lengths)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(max_len > 0, 1.0 - distances(rows) / max_len, 1.0)
+
+    return similarities
+
+def _top_k(scores: np.ndarray, k: int, largest: bool) -> tuple[np.ndarray, np.ndarray]:
+    keys = -scores if largest else scores
+    k = min(k, scores.shape[1])
+    candidates = np.argpartition(keys, k - 1, axis=1)[:, :k] if k < scores.shape[1] else \
+                 np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    candidate_keys = np.take_along_axis(keys, candidates, axis=1)
+    order = np.lexsort((candidates, candidate_keys), axis=1)
+    indices = np.take_along_axis(candidates, order, axis=1)
+    return indices, np.take_along_axis(scores, indices, axis=1)
+
+def cdist(queries: Iterable[Indexable[A]], 
+          choices: Iterable[Indexable[A]], 
+          scorer: str|Callable = normalized_levenshtein_similarity,
+          top_k: int = None) -> np.ndarray | tuple[np.ndarray, np.ndarray]:
+    """
+    Calcula la matriz de puntajes entre todas las consultas y todas las elecciones.
+    Para los puntajes conocidos el cálculo se hace por lotes con NumPy, sin una llamada de Python por par:
+        - 'levenshtein' o levenshtein_distance: algoritmo bit-paralelo de Myers para consultas de
+          hasta 64 elementos y programación dinámica de dos filas vectorizada para las más largas.
+        - 'normalized_levenshtein' o normalized_levenshtein_similarity: 1 - distancia / max(N, M),
+          con el mapper por defecto.
+        - 'jaccard' o jaccard_similarity: sobre conjuntos (o set(x) si x no lo es), con un índice invertido.
+    Cualquier otra función de dos argumentos se evalúa par por par.
+
+    Args:
+        queries: Iterable[Indexable[A]], de tamaño Q
+        choices: Iterable[Indexable[A]], de tamaño C
+        scorer: str | Callable, default = normalized_levenshtein_similarity
+        top_k: int, default = None
+        resultado:
+            Si top_k es None, una matriz de (Q, C) con los puntajes.
+            Si no, una tupla (índices, puntajes), ambas de (Q, min(top_k, C)), ordenadas de mejor a peor.
+            Para 'levenshtein' los mejores son las distancias más chicas; para el resto, los puntajes más altos.
+    """
+    queries, choices = list(queries), list(choices)
+    name = _scorer_name(scorer)
+
+    scores_of = _score_matrix(name, scorer, queries, choices)
+
+    if top_k is None:
+        return scores_of(slice(None))
+
+    if top_k < 1:
+        raise ValueError("'top_k' must be a positive integer.")
+
+    k = min(top_k, len(choices))
+    indices = np.empty((len(queries), k), dtype=np.int64)
+    scores = np.empty((len(queries), k), dtype=np.int64 if name == 'levenshtein' else np.float64)
+    if k == 0:
+        return indices, scores
+
+    batch = max(1, _MAX_BLOCK_CELLS // len(choices))
+    for start in range(0, len(queries), batch):
+        block = scores_of(slice(start, start + batch))
+        indices[start:start + batch], scores[start:start + batch] = _top_k(block, k, largest=(name != 'levenshtein'))
+
+    return indices, scores
+
+# =============================================================================================
+
+_PAD = '\0'
+
+def _qgrams(s: str, q: int) -> Counter:
+    padded = _PAD * (q - 1) + s + _PAD * (q - 1)
+    return Counter(padded[i:i + q] for i in range(len(padded) - q + 1))
+
+class Index:
+    """
+    Índice sobre un corpus de cadenas para búsquedas aproximadas por similitud de Levenshtein normalizada.
+    Se construye una sola vez y combina:
+        - Cubetas por longitud: si |N - M| > (1 - s) * max(N, M), la similitud no puede llegar a s.
+        - Índice invertido de q-gramas (con relleno), ordenado por longitud: dos cadenas a distancia d
+          comparten al menos max(N, M) + q - 1 - q*d q-gramas, lo que acota la similitud sin calcularla.
+    Los candidatos se verifican de mayor a menor cota, en lotes que se duplican, y la búsqueda termina cuando la cota
+    del siguiente ya no puede superar al peor de los k mejores. Sólo se tocan las cadenas que comparten
+    algún q-grama con la consulta (y, si la cota lo permite, las de longitud compatible).
+
+    Uso:
+        index = Index(corpus)
+        index.top_k(query, k=5, min_score=0.8) -> [(cadena, puntaje, posición), ...]
+        index.within(query, max_distance=2) -> [(cadena, distancia, posición), ...]
+    """
+    _batch = 32
+
+    def __init__(self, corpus: Iterable[str], q: int = 2):
+        if q < 1:
+            raise ValueError("'q' must be a positive integer.")
+
+        self.corpus = list(corpus)
+        self.q = q
+        self._lengths = np.array([len(s) for s in self.corpus], dtype=np.int64)
+
+        self._by_length: dict[int, np.ndarray] = {}
+        for i, n in enumerate(self._lengths.tolist()):
+            self._by_length.setdefault(n, []).append(i)
+        self._by_length = {n: np.array(ids, dtype=np.int64) for n, ids in self._by_length.items()}
+
+        postings: dict[str, tuple[list, list]] = {}
+        for i, s in enumerate(self.corpus):
+            for gram, count in _qgrams(s, q).items():
+                ids, counts = postings.setdefault(gram, ([], []))
+                ids.append(i)
+                counts.append(count)
+
+        # Cada lista de q-gramas queda ordenada por longitud, para recortarla con búsqueda binaria.
+        self._postings: dict[str, tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        for gram, (ids, counts) in postings.items():
+            ids = np.array(ids, dtype=np.int64)
+            order = np.argsort(self._lengths[ids], kind='stable')
+            ids = ids[order]
+            self._postings[gram] = (self._lengths[ids], ids, np.array(counts, dtype=np.int64)[order])
+
+    def __len__(self) -> int:
+        return len(self.corpus)
+
+    def _candidates(self, query: str, min_length: int, max_length: int) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Devuelve los candidatos con longitud en [min_length, max_length] que comparten algún q-grama
+        con la consulta, junto con la cantidad de q-gramas compartidos.
+        """
+        ids, overlaps = [], []
+        for gram, count in _qgrams(query, self.q).items():
+            if gram not in self._postings:
+                continue
+            lengths, gram_ids, gram_counts = self._postings[gram]
+            start, stop = np.searchsorted(lengths, (min_length, max_length + 1))
+            ids.append(gram_ids[start:stop])
+            overlaps.append(np.minimum(gram_counts[start:stop], count))
+
+        if not ids:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        candidates, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+        return candidates, np.bincount(inverse, weights=np.concatenate(overlaps)).astype(np.int64)
+
+    def _distance_lower_bounds(self, n: int, lengths: np.ndarray, overlaps: np.ndarray) -> np.ndarray:
+        longest = np.maximum(lengths, n)
+        by_qgrams = -((overlaps - longest - self.q + 1) // self.q)
+        return np.maximum(np.abs(lengths - n), by_qgrams)
+
+    def _without_overlap(self, lengths: Iterable[int], known: np.ndarray) -> np.ndarray:
+        ids = [self._by_length[n] for n in lengths if n in self._by_length]
+        if not ids:
+            return np.empty(0, dtype=np.int64)
+        return np.setdiff1d(np.concatenate(ids), known, assume_unique=True)
+
+    def _upper_bound(self, n: int, m: int, overlap: int) -> float:
+        longest = max(n, m)
+        if longest == 0:
+            return 1.0
+        bound = max(abs(n - m), -((overlap - longest - self.q + 1) // self.q))
+        return 1.0 - bound / longest
+
+    def _verify(self, query: str, ids: np.ndarray) -> np.ndarray:
+        return cdist([query], [self.corpus[i] for i in ids], scorer='levenshtein')[0]
+
+    def top_k(self, query: str, k: int = 1, min_score: float = 0.0) -> list[tuple[str, float, int]]:
+        """
+        Devuelve las k cadenas del corpus más similares a la consulta (similitud de Levenshtein
+        normalizada), con puntaje >= min_score, ordenadas de mayor a menor puntaje.
+
+        Args:
+            query: str
+            k: int, default = 1
+            min_score: BoundedFloat[0, 1], default = 0.0
+            resultado: list[tuple[str, BoundedFloat[0, 1], int]], con (cadena, puntaje, posición en el corpus)
+        """
+        if k < 1:
+            raise ValueError("'k' must be a positive integer.")
+
+        n = len(query)
+        if min_score > 0:
+            min_length, max_length = int(np.ceil(min_score * n)), int(np.floor(n / min_score))
+        else:
+            min_length, max_length = 0, int(self._lengths.max(initial=0))
+
+        candidates, overlaps = self._candidates(query, min_length, max_length)
+        lengths = self._lengths[candidates]
+
+        # Cadenas sin q-gramas en común: sólo se consideran las longitudes en las que la cota lo permite.
+        compatible = [m for m in range(min_length, max_length + 1)
+                      if self._upper_bound(n, m, 0) >= min_score]
+        if compatible:
+            rest = self._without_overlap(compatible, candidates)
+            candidates = np.concatenate((candidates, rest))
+            overlaps = np.concatenate((overlaps, np.zeros(len(rest), dtype=np.int64)))
+            lengths = self._lengths[candidates]
+
+        longest = np.maximum(lengths, n)
+        bounds = self._distance_lower_bounds(n, lengths, overlaps)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            upper = np.where(longest > 0, 1.0 - bounds / longest, 1.0)
+
+        order = np.lexsort((candidates, -upper))
+        candidates, upper, longest = candidates[order], upper[order], longest[order]
+
+        best: list[tuple[float, int]] = []
+        threshold = min_score
+        start, batch = 0, self._batch
+        while start < len(candidates) and upper[start] >= threshold:
+            # Los lotes se duplican: si la cota no poda, se verifica todo en pocas llamadas a cdist.
+            stop = start + batch
+            ids = candidates[start:stop]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                scores = np.where(longest[start:stop] > 0, 1.0 - self._verify(query, ids) / longest[start:stop], 1.0)
+            keep = np.flatnonzero(scores >= threshold)
+            if len(keep) > k:
+                keep = keep[np.lexsort((ids[keep], -scores[keep]))[:k]]
+            best.extend(zip(scores[keep].tolist(), ids[keep].tolist()))
+            best = sorted(best, key=lambda x: (-x[0], x[1]))[:k]
+            if len(best) == k:
+                threshold = max(threshold, np.nextafter(best[-1][0], np.inf))
+            start, batch = stop, 2 * batch
+
+        return [(self.corpus[i], score, i) for score, i in best]
+
+    def within(self, query: str, max_distance: int) -> list[tuple[str, int, int]]:
+        """
+        Devuelve todas las cadenas del corpus a distancia de Levenshtein <= max_distance de la consulta,
+        ordenadas por distancia.
+
+        Args:
+            query: str
+            max_distance: int
+            resultado: list[tuple[str, int, int]], con (cadena, distancia, posición en el corpus)
+        """
+        n = len(query)
+        min_length, max_length = max(0, n - max_distance), n + max_distance
+
+        candidates, overlaps = self._candidates(query, min_length, max_length)
+        lengths = self._lengths[candidates]
+        keep = self._distance_lower_bounds(n, lengths, overlaps) <= max_distance
+        candidates = candidates[keep]
+
+        compatible = [m for m in range(min_length, max_length + 1)
+                      if max(n, m) + self.q - 1 <= self.q * max_distance]
+        if compatible:
+            candidates = np.concatenate((candidates, self._without_overlap(compatible, candidates)))
+
+        distances = self._verify(query, candidates) if len(candidates) else np.empty(0, dtype=np.int64)
+        found = sorted((d, i) for d, i in zip(distances.tolist(), candidates.tolist()) if d <= max_distance)
+        return [(self.corpus[i], d, i) for d, i in found]
+
+# =============================================================================================
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+def _stable_hash(x) -> int:
+    """Hash de 32 bits estable entre procesos (a diferencia de hash() para str)."""
+    match x:
+        case bytes():
+            return zlib.crc32(x)
+        case str():
+            return zlib.crc32(x.encode('utf-8'))
+        case _:
+            return zlib.crc32(repr(x).encode('utf-8'))
+
+class MinHash:
+    """
+    Construye firmas MinHash de conjuntos. La proporción de posiciones iguales entre dos firmas
+    estima la similitud de Jaccard de los conjuntos, sin materializarlos ni compararlos.
+
+    Uso:
+        minhash = MinHash(num_perm=128)
+        minhash.signature({'a', 'b'}) -> np.ndarray[num_perm]
+        minhash.signatures([{'a', 'b'}, {'b', 'c'}]) -> np.ndarray[2, num_perm]
+        MinHash.jaccard(firma_a, firma_b) -> BoundedFloat[0, 1]
+    """
+    def __init__(self, num_perm: int = 128, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.num_perm = num_perm
+        self.seed = seed
+        self._a = rng.integers(1, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MERSENNE_PRIME, num_perm, dtype=np.uint64)
+
+    def _permute(self, hashes: np.ndarray) -> np.ndarray:
+        return ((np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME) & _MAX_HASH
+
+    def signature(self, tokens: Iterable[A]) -> np.ndarray:
+        hashes = np.fromiter((_stable_hash(x) for x in set(tokens)), dtype=np.uint64)
+        if not len(hashes):
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        return self._permute(hashes).min(axis=0).astype(np.uint32)
+
+    def signatures(self, sets: Iterable[Iterable[A]], batch_size: int = 1 << 14) -> np.ndarray:
+        """
+        Firmas de muchos conjuntos a la vez: los hashes de todos los elementos de un lote se permutan
+        juntos y se reducen por conjunto con np.minimum.reduceat.
+        """
+        sets = [x if isinstance(x, (set, frozenset)) else set(x) for x in sets]
+        result = np.full((len(sets), self.num_perm), _MAX_HASH, dtype=np.uint32)
+
+        for start in range(0, len(sets), batch_size):
+            batch = [(i, s) for i, s in enumerate(sets[start:start + batch_size], start) if s]
+            if not batch:
+                continue
+            sizes = np.array([len(s) for _, s in batch])
+            hashes = np.fromiter((_stable_hash(x) for _, s in batch for x in s), dtype=np.uint64, count=sizes.sum())
+            offsets = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+            result[[i for i, _ in batch]] = np.minimum.reduceat(self._permute(hashes), offsets, axis=0)
+
+        return result
+
+    @staticmethod
+    def jaccard(a: np.ndarray, b: np.ndarray) -> BoundedFloat[0, 1]:
+        return float(np.mean(a == b))
+
+def _lsh_parameters(threshold: float, num_perm: int) -> tuple[int, int]:
+    """
+    Elige (bandas, filas) con bandas * filas <= num_perm minimizando la suma de las probabilidades
+    de falsos positivos (debajo del umbral) y falsos negativos (encima del umbral).
+    """
+    def probability(s, bands, rows):
+        return 1 - (1 - s ** rows) ** bands
+
+    below = np.linspace(0, threshold, 64)
+    above = np.linspace(threshold, 1, 64)
+
+    best, best_error = (1, num_perm), np.inf
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            false_positives = probability(below, bands, rows).mean() * threshold
+            false_negatives = (1 - probability(above, bands, rows)).mean() * (1 - threshold)
+            if false_positives + false_negatives < best_error:
+                best, best_error = (bands, rows), false_positives + false_negatives
+    return best
+
+class LSH:
+    """
+    Índice de locality-sensitive hashing sobre firmas MinHash: cada firma se parte en bandas y dos
+    claves son candidatas si coinciden en todas las filas de al menos una banda. La cantidad de bandas
+    y filas se elige para que la probabilidad de ser candidatos salte cerca de `threshold`.
+
+    Uso:
+        lsh = LSH(threshold=0.8, num_perm=128)
+        lsh.insert(clave, firma)
+        lsh.query(firma) -> set[clave]
+        lsh.candidate_pairs() -> Iterator[tuple[clave, clave]]
+    """
+    def __init__(self, threshold: float = 0.5, num_perm: int = 128, bands: int = None, rows: int = None):
+        if bands is None or rows is None:
+            bands, rows = _lsh_parameters(threshold, num_perm)
+        if bands * rows > num_perm:
+            raise ValueError(f"'bands' * 'rows' ({bands * rows}) can't exceed 'num_perm' ({num_perm}).")
+
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = rows
+        self._buckets: list[dict[bytes, list]] = [{} for _ in range(bands)]
+        self._signatures: dict = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key) -> bool:
+        return key in self._signatures
+
+    def _band_keys(self, signature: np.ndarray):
+        signature = np.ascontiguousarray(signature, dtype=np.uint32)
+        for band in range(self.bands):
+            yield signature[band * self.rows:(band + 1) * self.rows].tobytes()
+
+    def insert(self, key, signature: np.ndarray):
+        if key in self._signatures:
+            raise ValueError(f"Key {key!r} is already in the index.")
+        self._signatures[key] = signature
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            buckets.setdefault(band_key, []).append(key)
+
+    def query(self, signature: np.ndarray) -> set:
+        candidates = set()
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(buckets.get(band_key, ()))
+        return candidates
+
+    def candidate_pairs(self) -> Iterator[tuple]:
+        """Genera cada par de claves que comparte alguna banda, una sola vez."""
+        seen = set()
+        for buckets in self._buckets:
+            for keys in buckets.values():
+                for pair in combinations(keys, 2):
+                    if pair not in seen:
+                        seen.add(pair)
+                        yield pair
+
+    def signature(self, key) -> np.ndarray:
+        return self._signatures[key]
+
+def similar_pairs(sets: Iterable[Iterable[A]], 
+                  threshold: float = 0.5, 
+                  num_perm: int = 128, 
+                  rescore: bool = False, 
+                  seed: int = 1) -> Iterator[tuple[int, int, BoundedFloat[0, 1]]]:
+    """
+    Genera los pares de conjuntos con similitud de Jaccard >= threshold sin comparar todos contra todos:
+    las firmas MinHash se indexan con LSH, y los candidatos se filtran por la similitud estimada.
+    Si rescore es verdadero, los pares que pasan el filtro se vuelven a puntuar con jaccard_similarity
+    (exacto) y se descartan los que no alcanzan el umbral.
+
+    Args:
+        sets: Iterable[Iterable[A]]
+        threshold: BoundedFloat[0, 1], default = 0.5
+        num_perm: int, default = 128
+        rescore: bool, default = False
+        seed: int, default = 1
+        resultado: Iterator[tuple[int, int, BoundedFloat[0, 1]]], con (i, j, similitud) e i < j
+    """
+    sets = [x if isinstance(x, (set, frozenset)) else set(x) for x in sets]
+    signatures = MinHash(num_perm, seed).signatures(sets)
+
+    lsh = LSH(threshold, num_perm)
+    for i, signature in enumerate(signatures):
+        lsh.insert(i, signature)
+
+    for i, j in lsh.candidate_pairs():
+        score = MinHash.jaccard(signatures[i], signatures[j])
+        if score < threshold:
+            continue
+        if rescore:
+            # Dos conjuntos vacíos son iguales: similitud 1, como en cdist.
+            score = jaccard_similarity(sets[i], sets[j]) if sets[i] or sets[j] else 1.0
+            if score < threshold:
+                continue
+        yield (i, j, score)
+
+# =============================================================================================
+
+def _dedupe_shard(start: int, stop: int, strings: list, scorer, threshold) -> np.ndarray:
+    """
+    Compara las cadenas [start, stop) consigo mismas y con todas las posteriores (la cola), por bloques.
+    Devuelve los pares (i, j) globales, con i < j, que superan el umbral.
+    """
+    name = _scorer_name(scorer)
+    shard = strings[start:stop]
+    block_size = max(1, _MAX_BLOCK_CELLS // max(1, len(shard)))
+    pairs = []
+
+    for offset in range(start, len(strings), block_size):
+        scores = cdist(shard, strings[offset:offset + block_size], scorer=scorer)
+        matches = scores <= threshold if name == 'levenshtein' else scores >= threshold
+        i, j = np.nonzero(matches)
+        i, j = i + start, j + offset
+        keep = i < j  # la cola empieza en el propio fragmento
+        pairs.append(np.stack((i[keep], j[keep]), axis=1))
+
+    return np.concatenate(pairs) if pairs else np.empty((0, 2), dtype=np.int64)
+
+_dedupe_state = {}
+
+def _share_dedupe(strings: list, scorer, threshold):
+    """Inicializador de los workers de `dedupe`: cada proceso recibe las cadenas una sola vez."""
+    _dedupe_state.update(strings=strings, scorer=scorer, threshold=threshold)
+
+def _shared_dedupe_shard(start: int, stop: int) -> np.ndarray:
+    return _dedupe_shard(start, stop, **_dedupe_state)
+
+def _find(parent: list[int], x: int) -> int:
+    while parent[x] != x:
+        parent[x] = parent[parent[x]]
+        x = parent[x]
+    return x
+
+def _clusters(n: int, pairs: Iterable[tuple[int, int]]) -> list[list[int]]:
+    """Une los pares con union-find. Cada grupo queda representado por su menor índice."""
+    parent = list(range(n))
+    for i, j in pairs:
+        a, b = _find(parent, i), _find(parent, j)
+        if a != b:
+            parent[max(a, b)] = min(a, b)
+
+    groups: dict[int, list[int]] = {}
+    for i in range(n):
+        groups.setdefault(_find(parent, i), []).append(i)
+    return list(groups.values())
+
+def dedupe(strings: Iterable[Indexable[A]], 
+           threshold: float, 
+           executor: type[Executor] = Multiprocess, 
+           scorer: str|Callable = normalized_levenshtein_similarity,
+           shards: int = None,
+           **tqdm_kwargs) -> list[list[int]]:
+    """
+    Agrupa las cadenas que son similares entre sí (por transitividad), repartiendo el cálculo en el executor.
+    Las cadenas se parten en fragmentos; cada tarea compara un fragmento con la cola de cadenas posteriores
+    (en lugar de un par por tarea), puntúa con cdist dentro del worker y devuelve sólo los pares que superan
+    el umbral. Los grupos se arman en el proceso principal con union-find.
+    Con Multiprocess las cadenas se mandan una sola vez a cada worker (en el inicializador del pool) y las
+    tareas sólo llevan los límites de su fragmento; con un executor ya ligado a un pool (`bind`) viajan con cada tarea.
+
+    Con 'levenshtein' el umbral es una distancia máxima; con el resto, un puntaje mínimo.
+
+    Args:
+        strings: Iterable[Indexable[A]]
+        threshold: float
+        executor: type[Executor], default = Multiprocess
+        scorer: str | Callable, default = normalized_levenshtein_similarity
+        shards: int, default = 4 * cpu_count()
+        resultado: list[list[int]], con los índices de cada grupo (incluye los grupos de un solo elemento),
+                   ordenados por su menor índice.
+    """
+    strings = list(strings)
+    if not strings:
+        return []
+
+    shards = min(len(strings), shards or 4 * (cpu_count() or 1))
+    bounds = np.linspace(0, len(strings), shards + 1).astype(int)
+    starts, stops = zip(*((start, stop) for start, stop in zip(bounds[:-1].tolist(), bounds[1:].tolist()) if stop > start))
+    kwargs = {'total': len(starts), 'chunksize': 1} | tqdm_kwargs
+
+    if issubclass(executor, Multiprocess) and executor.pool is None:
+        with ProcessPool(kwargs.pop('max_workers', None), initializer=_share_dedupe, initargs=(strings, scorer, threshold)) as pool:
+            results = executor.bind(pool).map(_shared_dedupe_shard, starts, stops, **kwargs)
+    else:
+        results = executor.map(partial(_dedupe_shard, strings=strings, scorer=scorer, threshold=threshold), starts, stops, **kwargs)
+    pairs = np.concatenate(results) if results else np.empty((0, 2), dtype=np.int64)
+    return _clusters(len(strings), pairs.tolist())
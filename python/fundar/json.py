@@ -1,121 +1,727 @@
-from functools import wraps
-from .utils import load_from_str_or_buf
+from functools import wraps, partial
+from .utils import open_str_or_buf, MethodMapping
 import json as json_
+import io
+import os
+import gzip
 from os import makedirs
-from os.path import dirname
+from os.path import dirname, basename
+from os import PathLike
+from tempfile import mkstemp
+from contextlib import contextmanager, nullcontext, suppress
+from codecs import getincrementaldecoder
+from typing import Iterator, Iterable
+from itertools import islice
+from random import Random
+import re
+
+class Backend:
+    """
+    Implementación de `loads`/`dumps` usada por `load` y `dump`.
+    `dumps(obj, kwargs)` devuelve str o bytes, o None si no soporta alguno de los kwargs o no puede escribir `obj`
+    (enteros de más de 64 bits, por ejemplo); en ese caso se usa la stdlib.
+    Con kwargs, `loads` siempre pasa por la stdlib: ninguna de las alternativas acepta object_hook, parse_float, etc.
+    Si `loads` falla (NaN, Infinity) también se reintenta con la stdlib.
+    """
+    def __init__(self, name, loads, dumps):
+        self.name = name
+        self.loads = loads
+        self.dumps = dumps
+
+    def __repr__(self):
+        return f'Backend({self.name!r})'
+
+def _stdlib_dumps(obj, kwargs):
+    return json_.dumps(obj, **kwargs)
+
+# 19 dígitos seguidos: un entero que puede no entrar en 64 bits (o dígitos dentro de un string, que no hacen daño).
+_LONG_DIGITS = re.compile(r'\d{19}')
+_LONG_DIGITS_BYTES = re.compile(rb'\d{19}')
+
+def _orjson_backend():
+    import orjson
+
+    def loads(data):
+        # orjson convierte en float los enteros que no entran en 64 bits: esos documentos se leen con la stdlib.
+        pattern = _LONG_DIGITS_BYTES if isinstance(data, (bytes, bytearray, memoryview)) else _LONG_DIGITS
+        if pattern.search(data):
+            return json_.loads(data)
+        return orjson.loads(data)
+
+    def dumps(obj, kwargs):
+        kwargs = dict(kwargs)
+        option = 0
+        if kwargs.pop('sort_keys', False):
+            option |= orjson.OPT_SORT_KEYS
+        match kwargs.pop('indent', None):
+            case None:
+                pass
+            case 2:
+                option |= orjson.OPT_INDENT_2
+            case _:
+                return None
+        # orjson siempre escribe UTF-8 sin escapar: un ensure_ascii=True explícito tiene que ir a la stdlib.
+        if kwargs.pop('ensure_ascii', False) or set(kwargs) - {'default'}:
+            return None
+        try:
+            # Con OPT_NON_STR_KEYS las claves int, float, etc. se escriben como texto, igual que en la stdlib.
+            return orjson.dumps(obj, option=option | orjson.OPT_NON_STR_KEYS, **kwargs)
+        except orjson.JSONEncodeError:
+            return None
+
+    return Backend('orjson', loads, dumps)
+
+def _ujson_backend():
+    import ujson
+
+    def dumps(obj, kwargs):
+        if set(kwargs) - {'ensure_ascii', 'indent', 'sort_keys', 'default'}:
+            return None
+        try:
+            return ujson.dumps(obj, escape_forward_slashes=False, **kwargs)
+        except (OverflowError, TypeError, ValueError):
+            return None
+
+    return Backend('ujson', ujson.loads, dumps)
+
+def _simdjson_backend():
+    import simdjson
+    # simdjson sólo parsea; para escribir se usa la stdlib.
+    return Backend('simdjson', simdjson.loads, _stdlib_dumps)
+
+backends = MethodMapping({
+    'orjson': _orjson_backend,
+    'ujson': _ujson_backend,
+    'simdjson': _simdjson_backend,
+    'json': lambda: Backend('json', json_.loads, _stdlib_dumps),
+})
+
+_backend = None
+
+def set_backend(name: str = 'auto') -> Backend:
+    """
+    Elige la implementación que usan `load` y `dump`: 'orjson', 'ujson', 'simdjson', 'json' (stdlib)
+    o 'auto', que toma la primera de esa lista que esté instalada. Por defecto se usa la stdlib.
+    Los backends rápidos escriben JSON equivalente pero sin los espacios de la stdlib, y orjson no escapa lo que no es ASCII
+    salvo que se pida ensure_ascii=True (que pasa por la stdlib). Ojo: orjson escribe NaN e Infinity como null.
+    """
+    global _backend
+    if name == 'auto':
+        for name, make in backends.items():
+            try:
+                _backend = make()
+                return _backend
+            except ImportError:
+                continue
+
+    if name not in backends:
+        raise ValueError(f"Backend desconocido: {name!r}. Las opciones son 'auto', {', '.join(map(repr, backends))}.")
+    _backend = backends[name]()
+    return _backend
+
+def get_backend() -> str:
+    """Nombre del backend activo."""
+    return _backend.name
+
+def _loads(data, kwargs):
+    if kwargs:
+        return json_.loads(data, **kwargs)
+    try:
+        return _backend.loads(data)
+    except ValueError:
+        return json_.loads(data)
+
+def _dumps(obj, kwargs):
+    result = _backend.dumps(obj, kwargs)
+    return json_.dumps(obj, **kwargs) if result is None else result
+
+def _is_binary(fp):
+    return isinstance(fp, (io.RawIOBase, io.BufferedIOBase)) or 'b' in getattr(fp, 'mode', '')
+
+WRITE_BUFFER = 1 << 20
+
+def _current_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+_UMASK = _current_umask()
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Para escribir .zst hace falta 'zstandard' (pip install zstandard).") from None
+    return zstandard
+
+def _compression(path):
+    path = os.fspath(path)
+    return 'gzip' if path.endswith('.gz') else 'zstd' if path.endswith('.zst') else None
+
+def _compressor(path, raw):
+    match _compression(path):
+        case 'gzip':
+            return gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6)
+        case 'zstd':
+            return _zstandard().ZstdCompressor().stream_writer(raw, closefd=False)
+        case _:
+            return nullcontext(raw)
+
+@contextmanager
+def _atomic_writer(path):
+    """
+    Abre un temporal binario (comprimido según la extensión) al lado de `path` y, si todo sale bien, lo renombra a `path`.
+    Si algo falla a mitad de camino, `path` queda como estaba.
+    """
+    path = os.fspath(path)
+    directory = dirname(path) or '.'
+    makedirs(directory, exist_ok=True)
+
+    fd, tmp = mkstemp(dir=directory, prefix=f'.{basename(path)}.', suffix='.tmp')
+    try:
+        with open(fd, 'wb', buffering=WRITE_BUFFER) as raw, _compressor(path, raw) as fp:
+            yield fp
+        # mkstemp crea el archivo con permisos 0600; se dejan los que tendría un archivo nuevo (o los del que se reemplaza).
+        os.chmod(tmp, os.stat(path).st_mode if os.path.exists(path) else 0o666 & ~_UMASK)
+        os.replace(tmp, path)
+    except BaseException:
+        with suppress(FileNotFoundError):
+            os.remove(tmp)
+        raise
+
+def _is_path(path_or_buf):
+    return isinstance(path_or_buf, (str, PathLike))
+
+def _encoded(text, binary):
+    if binary:
+        return text.encode('utf-8') if isinstance(text, str) else text
+    return text.decode('utf-8') if isinstance(text, bytes) else text
 
 @wraps(json_.load)
 def load(path_or_buf, **kwargs):
-    return json_.load(fp=load_from_str_or_buf(path_or_buf), **kwargs)
+    with open_str_or_buf(path_or_buf) as fp:
+        return _loads(fp.read(), kwargs)
 
 @wraps(json_.dump)
 def dump(obj, path_or_buf, **kwargs):
-    if isinstance(path_or_buf, str):
-        makedirs(dirname(path_or_buf), exist_ok=True)
-        with open(path_or_buf, 'w', encoding='utf-8') as fp:
-            return dump(obj, path_or_buf=fp, **kwargs)
-    
-    return json_.dump(obj=obj, fp=path_or_buf, **kwargs)
+    """
+    Como `json.dump`, pero si `path_or_buf` es una ruta escribe a un temporal y lo renombra al terminar,
+    y comprime si la extensión es .gz o .zst.
+    """
+    # Con la stdlib (o si el backend no puede con `obj`) se escribe de a pedazos, sin armar el documento entero en memoria.
+    text = None if _backend.dumps is _stdlib_dumps else _backend.dumps(obj, kwargs)
+    if _is_path(path_or_buf):
+        with _atomic_writer(path_or_buf) as fp:
+            _write(obj, text, fp, True, kwargs)
+    else:
+        _write(obj, text, path_or_buf, _is_binary(path_or_buf), kwargs)
+
+def _write(obj, text, fp, binary, kwargs):
+    if text is not None:
+        fp.write(_encoded(text, binary))
+    elif not binary:
+        json_.dump(obj, fp, **kwargs)
+    else:
+        wrapper = io.TextIOWrapper(fp, encoding='utf-8', newline='')
+        json_.dump(obj, wrapper, **kwargs)
+        # `detach` vacía el wrapper sin cerrar `fp`.
+        wrapper.detach()
+
+def _write_lines(objs, fp, binary, kwargs):
+    newline = _encoded('\n', binary)
+    for obj in objs:
+        fp.write(_encoded(_dumps(obj, kwargs), binary) + newline)
+
+def dump_lines(objs, path_or_buf, **kwargs):
+    """
+    Escribe `objs` como JSON Lines (un valor por línea) a medida que los consume, sin armar la lista entera.
+    Con una ruta, la escritura es atómica y comprimida igual que en `dump`.
+    """
+    if 'indent' in kwargs:
+        raise ValueError("JSON Lines no admite 'indent': cada valor tiene que ocupar una sola línea.")
+
+    if _is_path(path_or_buf):
+        with _atomic_writer(path_or_buf) as fp:
+            _write_lines(objs, fp, True, kwargs)
+    else:
+        _write_lines(objs, path_or_buf, _is_binary(path_or_buf), kwargs)
+
+set_backend('json')
+
+CHUNK_SIZE = 1 << 20
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+_NUMBER_CONTINUATION = set('0123456789.eE+-') | {''}
+
+def _text_chunks(path_or_buf, chunk_size):
+    with open_str_or_buf(path_or_buf) as f:
+        # Los bytes se decodifican de a bloques: un carácter multibyte puede quedar partido entre dos lecturas.
+        decoder = getincrementaldecoder('utf-8-sig')()
+        while chunk := f.read(chunk_size):
+            yield decoder.decode(chunk) if isinstance(chunk, bytes) else chunk
+        yield decoder.decode(b'', final=True)
+
+def _is_lines(path_or_buf):
+    if not _is_path(path_or_buf):
+        return False
+    path = os.fspath(path_or_buf).removesuffix('.gz').removesuffix('.zst')
+    return path.endswith(('.jsonl', '.ndjson'))
+
+def iter_load(path_or_buf, lines: bool = None, chunk_size: int = CHUNK_SIZE, key: str | list = None, **kwargs) -> Iterator:
+    """
+    Versión en streaming de `load`: lee `path_or_buf` de a `chunk_size` bytes y va devolviendo valores,
+    sin tener el archivo entero ni el árbol completo en memoria.
+    Si el documento es un array, devuelve sus elementos uno por uno; si no, devuelve el valor.
+    Con `key` (un camino de claves, como 'data' o 'result.items', o una lista de claves) se baja primero hasta ese valor
+    dentro del documento, así se puede recorrer un array anidado como el de {"data": [...]}.
+    Lo comprimido con gzip, bz2 o zstd se descomprime al vuelo.
+    Con lines=True (por defecto para .jsonl y .ndjson) devuelve cada valor de una secuencia de valores JSON.
+    El resto de los kwargs van a `json.JSONDecoder` (object_hook, parse_float, etc.).
+    """
+    decode = json_.JSONDecoder(**kwargs).raw_decode
+    lines = _is_lines(path_or_buf) if lines is None else lines
+    keys = key.split('.') if isinstance(key, str) else list(key or [])
+    chunks = _text_chunks(path_or_buf, chunk_size)
+
+    buffer, position, eof = '', 0, False
+
+    def more(at_least=0):
+        nonlocal buffer, position, eof
+        parts, size = [buffer[position:]], 0
+        while not eof and size <= at_least:
+            chunk = next(chunks, None)
+            if chunk is None:
+                eof = True
+            else:
+                parts.append(chunk)
+                size += len(chunk)
+        buffer, position = ''.join(parts), 0
+
+    def skip_whitespace():
+        nonlocal position
+        while True:
+            position = _WHITESPACE.match(buffer, position).end()
+            if position < len(buffer) or eof:
+                return
+            more()
+
+    def expect(delimiter):
+        nonlocal position
+        if buffer[position:position + 1] != delimiter:
+            raise json_.JSONDecodeError(f'Expecting {delimiter!r} delimiter', buffer, position)
+        position += 1
+        skip_whitespace()
+
+    def value():
+        nonlocal position
+        while True:
+            try:
+                obj, end = decode(buffer, position)
+                # Un número que llega hasta el final del buffer, o seguido de algo que podría continuarlo, puede estar cortado.
+                if eof or buffer[end:end + 1] not in _NUMBER_CONTINUATION:
+                    position = end
+                    return obj
+            except json_.JSONDecodeError:
+                if eof:
+                    raise
+            # Cada reintento decodifica desde el principio del valor: al menos se duplica lo leído para que el costo total sea lineal.
+            more(len(buffer) - position)
+
+    def find(name):
+        nonlocal position
+        expect('{')
+        while buffer[position:position + 1] != '}':
+            member = value()
+            skip_whitespace()
+            expect(':')
+            if member == name:
+                return
+            value()
+            skip_whitespace()
+            if buffer[position:position + 1] != '}':
+                expect(',')
+        raise KeyError(name)
+
+    skip_whitespace()
+    for name in keys:
+        find(name)
+
+    array = not lines and buffer[position:position + 1] == '['
+
+    if not array:
+        while position < len(buffer):
+            yield value()
+            skip_whitespace()
+            if keys:
+                return
+            if not lines and position < len(buffer):
+                raise json_.JSONDecodeError('Extra data', buffer, position)
+        return
+
+    position += 1
+    skip_whitespace()
+    if buffer[position:position + 1] == ']':
+        return
+
+    while True:
+        yield value()
+        skip_whitespace()
+        if buffer[position:position + 1] == ']':
+            return
+        expect(',')
 
 def __getattr__(x):
     return getattr(json_, x)
 
 import pandas as pd
 
-def generate_json_schema(data):
-    def infer_schema(value):
-        if isinstance(value, dict):
-            properties = {}
-            required = []
+_TYPE_ORDER = ['object', 'array', 'string', 'number', 'integer', 'boolean', 'null']
+
+def _json_type(value):
+    match value:
+        case dict():
+            return 'object'
+        case list():
+            return 'array'
+        case str():
+            return 'string'
+        case bool():
+            return 'boolean'
+        case int():
+            return 'integer'
+        case float():
+            return 'number'
+        case None:
+            return 'null'
+        case _:
+            return None
+
+class SchemaBuilder:
+    """
+    Infiere un JSON Schema de a un valor por vez, unificando lo que ve:
+    los tipos se juntan en una lista ('integer' y 'number' quedan como 'number'), un campo es requerido sólo si
+    apareció en todos los objetos y los ítems de todos los arrays comparten un único schema.
+    Un valor de tipo desconocido vuelve el schema `{}` (cualquier cosa), igual que antes.
+    """
+    __slots__ = ('types', 'objects', 'properties', 'presence', 'items', 'unknown')
+
+    def __init__(self):
+        self.types = set()
+        self.objects = 0
+        self.properties = {}
+        self.presence = {}
+        self.items = None
+        self.unknown = False
+
+    def add(self, value):
+        t = _json_type(value)
+        if t is None:
+            self.unknown = True
+            return self
+        self.types.add(t)
+
+        if t == 'object':
+            self.objects += 1
             for k, v in value.items():
-                properties[k] = infer_schema(v)
-                required.append(k)
-            return {
-                "type": "object",
-                "properties": properties,
-                "required": required
-            }
-        elif isinstance(value, list):
-            if value:
-                item_schemas = [infer_schema(item) for item in value]
-                # Simplify if all item schemas are the same
-                if all(schema == item_schemas[0] for schema in item_schemas):
-                    return {
-                        "type": "array",
-                        "items": item_schemas[0]
-                    }
-                else:
-                    return {
-                        "type": "array",
-                        "items": {
-                            "anyOf": item_schemas
-                        }
-                    }
-            else:
-                # Empty array; cannot determine item schema
-                return {
-                    "type": "array",
-                    "items": {}
-                }
+                builder = self.properties.get(k)
+                if builder is None:
+                    builder = self.properties[k] = SchemaBuilder()
+                    self.presence[k] = 0
+                builder.add(v)
+                self.presence[k] += 1
+        elif t == 'array':
+            if self.items is None:
+                self.items = SchemaBuilder()
+            for item in value:
+                self.items.add(item)
+        return self
+
+    def schema(self) -> dict:
+        if self.unknown or not self.types:
+            return {}
+
+        types = self.types - {'integer'} if 'number' in self.types else self.types
+        types = [t for t in _TYPE_ORDER if t in types]
+        schema = {'type': types[0] if len(types) == 1 else types}
+
+        if 'object' in types:
+            schema['properties'] = {k: builder.schema() for k, builder in self.properties.items()}
+            schema['required'] = [k for k, n in self.presence.items() if n == self.objects]
+        if 'array' in types:
+            schema['items'] = self.items.schema()
+        return schema
+
+def _sample(records, sample, method, seed):
+    if sample is None:
+        return records
+    if method == 'head':
+        return islice(records, sample)
+    if method != 'random':
+        raise ValueError(f"Método de muestreo desconocido: {method!r}. Las opciones son 'head' y 'random'.")
+
+    # Reservoir sampling: una sola pasada, sirve para iteradores de largo desconocido.
+    rng = Random(seed)
+    reservoir = []
+    for i, record in enumerate(records):
+        if i < sample:
+            reservoir.append(record)
         else:
-            # Primitive types
-            if isinstance(value, str):
-                return {"type": "string"}
-            elif isinstance(value, bool):
-                return {"type": "boolean"}
-            elif isinstance(value, int):
-                return {"type": "integer"}
-            elif isinstance(value, float):
-                return {"type": "number"}
-            elif value is None:
-                return {"type": "null"}
-            else:
-                return {}
-
-    return infer_schema(data)
-
-def json_to_table(json_schema, json_data):
-    def flatten_json(data, schema, parent_key='', parent_rows=None):
-        if parent_rows is None:
-            parent_rows = [{}]
-
-        data_type = schema.get('type')
-
-        if data_type == 'object':
-            properties = schema.get('properties', {})
-            for key, subschema in properties.items():
-                value = data.get(key)
-                new_key = f"{parent_key}.{key}" if parent_key else key
-
-                new_parent_rows = []
-                for parent_row in parent_rows:
-                    if value is not None:
-                        sub_rows = flatten_json(value, subschema, new_key, [parent_row.copy()])
-                        new_parent_rows.extend(sub_rows)
-                    else:
-                        parent_row[new_key] = None
-                        new_parent_rows.append(parent_row)
-                parent_rows = new_parent_rows
-
-        elif data_type == 'array':
-            items_schema = schema.get('items')
-            new_parent_rows = []
-            if isinstance(data, list):
-                for item in data:
-                    for parent_row in parent_rows:
-                        sub_rows = flatten_json(item, items_schema, parent_key, [parent_row.copy()])
-                        new_parent_rows.extend(sub_rows)
-                parent_rows = new_parent_rows
-            else:
-                # Data is not a list but schema says it should be
-                pass  # Handle error or treat as empty list
+            j = rng.randrange(i + 1)
+            if j < sample:
+                reservoir[j] = record
+    return reservoir
+
+def infer_schema(records: Iterable, sample: int = None, method: str = 'head', seed: int = None) -> dict:
+    """
+    Schema que cubre a todos los `records` (una lista o cualquier iterador, por ejemplo `iter_load(...)`).
+    Con `sample` sólo se miran `sample` registros: los primeros (method='head') o una muestra uniforme (method='random').
+    """
+    builder = SchemaBuilder()
+    for record in _sample(records, sample, method, seed):
+        builder.add(record)
+    return builder.schema()
+
+def generate_json_schema(data, sample: int = None, method: str = 'head', seed: int = None):
+    """
+    Genera el JSON Schema de `data`.
+    Si `data` es una lista, el schema de sus ítems se infiere con `infer_schema` (opcionalmente sobre una muestra).
+    """
+    if isinstance(data, list):
+        return {'type': 'array', 'items': infer_schema(data, sample, method, seed)}
+    return SchemaBuilder().add(data).schema()
+
+def _matches(schema, t):
+    types = schema.get('type')
+    types = types if isinstance(types, list) else [types]
+    return t in types or (t == 'integer' and 'number' in types)
+
+def _resolve_type(schema, data):
+    """
+    Tipo con el que se aplana `data` según `schema`, resolviendo listas de tipos y anyOf con el tipo del dato.
+    Lo que no es objeto ni array se trata como primitivo (None).
+    """
+    if 'anyOf' in schema:
+        t = _json_type(data)
+        option = next((option for option in schema['anyOf'] if _matches(option, t)), None)
+        return _resolve_type(option, data) if option is not None else (None, schema)
+
+    data_type = schema.get('type')
+    if isinstance(data_type, list):
+        t = _json_type(data)
+        data_type = t if t in ('object', 'array') and t in data_type else None
+    return data_type, schema
+
+ROOT = '$'
+
+ARRAY_MODES = ('explode', 'serialize', 'split')
+
+class _Flattener:
+    """
+    Aplana registros según un schema, devolviendo por cada valor la lista de fragmentos de fila que genera
+    (varios si hay arrays que se explotan). Los fragmentos se combinan recién al armar cada fila.
+    Las filas de las tablas hijas ('split') se acumulan en `pending` hasta que las levanta `record`.
+    Los `_id` se numeran por tabla a lo largo de todos los registros que pasan por la misma instancia.
+    """
+    def __init__(self, arrays, default):
+        for path, mode in (arrays | {'': default}).items():
+            if mode not in ARRAY_MODES:
+                raise ValueError(f"Modo desconocido para {path!r}: {mode!r}. Las opciones son {', '.join(map(repr, ARRAY_MODES))}.")
+        self.arrays = arrays
+        self.default = default
+        self.ids = {}
+        self.pending = []
+
+    def next_id(self, table):
+        self.ids[table] = self.ids.get(table, -1) + 1
+        return self.ids[table]
+
+    def record(self, record, schema):
+        """Pares (tabla, fila) de un registro: primero sus filas de `ROOT`, después las de las tablas hijas."""
+        split = 'split' in self.arrays.values() or self.default == 'split'
+        record_id = self.next_id(ROOT)
+        for row in self.fragments(record, schema, '', '', record_id):
+            yield ROOT, {'_id': record_id} | row if split else row
+        yield from self.pending
+        self.pending.clear()
+
+    def fragments(self, data, schema, path, key, owner):
+        data_type, schema = _resolve_type(schema, data)
+
+        if data_type == 'object' and isinstance(data, dict):
+            rows = [{}]
+            for name, subschema in schema.get('properties', {}).items():
+                value = data.get(name)
+                subpath = f'{path}.{name}' if path else name
+                subkey = f'{key}.{name}' if key else name
+                if value is None:
+                    parts = [{subkey: None}]
+                else:
+                    parts = self.fragments(value, subschema, subpath, subkey, owner)
+                rows = [row | part for row in rows for part in parts]
+            return rows
+
+        if data_type == 'array':
+            if not isinstance(data, list):
+                return [{}]
+
+            match self.arrays.get(path, self.default):
+                case 'serialize':
+                    return [{key: json_.dumps(data, ensure_ascii=False)}]
+                case 'split':
+                    self.split(data, schema.get('items') or {}, path, owner)
+                    return [{}]
+                case _:
+                    items = schema.get('items') or {}
+                    return [part for item in data for part in self.fragments(item, items, path, key, owner)]
+
+        return [{key: data}]
+
+    def split(self, data, items, path, owner):
+        for item in data:
+            item_id = self.next_id(path)
+            ids = {'_id': item_id, '_parent_id': owner}
+            for row in self.fragments(item, items, path, '', item_id):
+                self.pending.append((path, ids | ({'value': row.pop('')} if '' in row else {}) | row))
+
+def iter_rows(json_schema, records: Iterable, arrays: dict = None, default: str = 'explode') -> Iterator[tuple[str, dict]]:
+    """
+    Aplana `records` según `json_schema` (el schema de un registro) y devuelve pares (tabla, fila) a medida que los arma.
+    Las columnas se nombran con el camino de claves ('a.b.c'). `arrays` elige qué hacer con cada array, por camino:
+    - 'explode' (el default, como `json_to_table`): una fila por elemento; arrays hermanos se combinan entre sí.
+    - 'serialize': el array queda en una sola columna, como texto JSON.
+    - 'split': los elementos van a una tabla aparte, con nombre igual al camino, y columnas `_id` y `_parent_id`.
+    La tabla principal se llama `ROOT`; si hay arrays 'split', sus filas llevan `_id` (uno por registro).
+    """
+    flattener = _Flattener(arrays or {}, default)
+    for record in records:
+        yield from flattener.record(record, json_schema)
+
+def iter_tables(json_schema, records: Iterable, arrays: dict = None, default: str = 'explode', chunksize: int = 10_000) -> Iterator[dict[str, pd.DataFrame]]:
+    """
+    Como `iter_rows`, pero devuelve las tablas de a `chunksize` registros: un dict {tabla: DataFrame} por bloque.
+    Sirve para procesar un stream de registros (por ejemplo `iter_load(...)`) sin tener todo en memoria.
+    """
+    # Un solo `_Flattener` para todo el stream, así los `_id` no se repiten entre bloques.
+    flattener = _Flattener(arrays or {}, default)
+    iterator = iter(records)
+    while chunk := list(islice(iterator, chunksize)):
+        tables = {}
+        for record in chunk:
+            for table, row in flattener.record(record, json_schema):
+                tables.setdefault(table, []).append(row)
+        yield {table: pd.DataFrame(rows) for table, rows in tables.items()}
+
+def json_to_table(json_schema, json_data, arrays: dict = None):
+    """
+    Aplana `json_data` según `json_schema` en un DataFrame, explotando los arrays (ver `iter_rows`).
+    Con `arrays` se pueden serializar arrays en lugar de explotarlos; para tablas hijas usar `iter_rows`/`iter_tables`.
+    """
+    if arrays and 'split' in arrays.values():
+        raise ValueError("json_to_table devuelve una sola tabla: para arrays 'split' usar iter_tables.")
+
+    return pd.DataFrame(row for _, row in iter_rows(json_schema, [json_data], arrays))
+
+class CompiledSchema:
+    """
+    Extractor generado a partir del schema de un registro (por ejemplo `infer_schema(records)`):
+    el schema se recorre una sola vez al compilar y queda una función que, por registro, hace sólo los `get`
+    necesarios y agrega cada valor a la lista de su columna.
+    Devuelve una fila por registro: los arrays se serializan como texto JSON (arrays='serialize') o se dejan
+    como listas (arrays='keep'); para explotarlos usar `json_to_table`/`iter_rows`.
+    A diferencia de `json_to_table`, las columnas salen del schema: si falta un objeto, sus columnas quedan en None.
+    El código generado queda en `source`.
+    """
+    def __init__(self, json_schema, arrays: str = 'serialize'):
+        if arrays not in ('serialize', 'keep'):
+            raise ValueError(f"Modo desconocido para arrays: {arrays!r}. Las opciones son 'serialize' y 'keep'.")
+        if json_schema.get('type') == 'array':
+            json_schema = json_schema.get('items') or {}
+
+        self.arrays = arrays
+        self.columns = []
+        self._names = 0
+        types = json_schema.get('type')
+        if 'object' in (types if isinstance(types, list) else [types]):
+            body = self._object(json_schema, 'record', '', 2)
         else:
-            # Primitive type
-            for parent_row in parent_rows:
-                parent_row[parent_key] = data
+            body = self._leaf(json_schema, 'record', '', 2)
+
+        appends = '\n'.join(f'    c{i} = []; a{i} = c{i}.append' for i in range(len(self.columns)))
+        self.source = (
+            'def extract(records):\n'
+            f'{appends}\n'
+            '    for record in records:\n'
+            f'{body}\n'
+            f'    return [{", ".join(f"c{i}" for i in range(len(self.columns)))}]\n'
+        )
+
+        namespace = {'dumps': partial(json_.dumps, ensure_ascii=False)}
+        exec(self.source, namespace)
+        self._extract = namespace['extract']
+
+    def _variable(self):
+        self._names += 1
+        return f'v{self._names}'
+
+    def _column(self, key):
+        self.columns.append(key)
+        return f'a{len(self.columns) - 1}'
+
+    def _leaf(self, schema, value, key, depth):
+        indent = '    ' * depth
+        append = self._column(key)
+        types = schema.get('type')
+        types = types if isinstance(types, list) else [types]
+        if 'array' in types and self.arrays == 'serialize':
+            variable = self._variable()
+            return f'{indent}{variable} = {value}\n{indent}{append}(dumps({variable}) if type({variable}) is list else {variable})'
+        return f'{indent}{append}({value})'
+
+    def _object(self, schema, value, key, depth):
+        indent = '    ' * depth
+        lines = [f'{indent}if type({value}) is not dict: {value} = {{}}'] if value == 'record' else []
+
+        for name, subschema in schema.get('properties', {}).items():
+            subkey = f'{key}.{name}' if key else name
+            types = subschema.get('type')
+            types = types if isinstance(types, list) else [types]
+
+            if 'object' not in types or not subschema.get('properties'):
+                lines.append(self._leaf(subschema, f'{value}.get({name!r})', subkey, depth))
+                continue
+
+            variable = self._variable()
+            first = len(self.columns)
+            lines.append(f'{indent}{variable} = {value}.get({name!r})')
+            lines.append(f'{indent}if type({variable}) is dict:')
+            lines.append(self._object(subschema, variable, subkey, depth + 1))
+
+            # Si el schema admite otra cosa además de objetos, el valor va a una columna con la clave del objeto.
+            other = [t for t in types if t not in ('object', 'null')]
+            if other:
+                lines.append(f'{indent}    {self._column(subkey)}(None)')
+
+            nested = range(first, len(self.columns) - (1 if other else 0))
+            lines.append(f'{indent}else:')
+            lines.extend(f'{indent}    a{i}(None)' for i in nested)
+            if other:
+                lines.append(f'{indent}    a{len(self.columns) - 1}({variable})')
+
+        return '\n'.join(lines) if len(lines) > (1 if value == 'record' else 0) else f'{indent}pass'
+
+    def __call__(self, records: Iterable) -> dict[str, list]:
+        """Valores de cada columna, en el orden de `columns`."""
+        return dict(zip(self.columns, self._extract(records)))
+
+    def to_frame(self, records: Iterable) -> pd.DataFrame:
+        return pd.DataFrame(self(records), columns=self.columns)
 
-        return parent_rows
+    def iter_frames(self, records: Iterable, chunksize: int = 100_000) -> Iterator[pd.DataFrame]:
+        """DataFrames de a `chunksize` registros, para procesar un stream (por ejemplo `iter_load(...)`)."""
+        iterator = iter(records)
+        while chunk := list(islice(iterator, chunksize)):
+            yield self.to_frame(chunk)
 
-    rows = flatten_json(json_data, json_schema)
-    df = pd.DataFrame(rows)
-    return df
\ No newline at end of file
+def compile_schema(json_schema, arrays: str = 'serialize') -> CompiledSchema:
+    return CompiledSchema(json_schema, arrays)
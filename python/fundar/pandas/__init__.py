@@ -1,11 +1,9 @@
 import pandas as pandas_
 from pandas.core.series import Series as Series_
-from copy import copy
 from functools import partial, wraps
 from typing import TypeAlias, NewType, Type
-import csv as csv_
-
-original_to_csv = copy(pandas_.DataFrame.to_csv)
+from pandas.api.types import infer_dtype
+import numpy as np
 
 class DataFrame(pandas_.DataFrame): pass
 del DataFrame
@@ -13,24 +11,55 @@ del DataFrame
 class Series(Series_): pass
 del Series
 
-formato_fundar = {
-    'encoding': 'utf-8',
-    'sep': ',',
-    'quoting': csv_.QUOTE_ALL,
-    'quotechar': '"',
-    'lineterminator': '\n',
-    'decimal': '.',
-    'index': False,
-    'float_format': '%.5f'
-}
+from .io import original_to_csv, formato_fundar, to_fundar_csv, read_fundar_csv, enable_cache, disable_cache
 
 @wraps(original_to_csv)
 def to_csv_patch(self, path_or_buf, **kwargs):
     return original_to_csv(self, path_or_buf, **(formato_fundar|kwargs))
 
 pandas_.DataFrame.to_csv = to_csv_patch
-setattr(Series_, 'has', lambda self, x: self.map(lambda y: x in y))
-setattr(Series_, 'has_safe', lambda self, x: self.map(lambda y: False if '__contains__' not in dir(y) else x in y))
+setattr(pandas_.DataFrame, 'to_fundar_csv', to_fundar_csv)
+
+from .memory import shrink
+
+setattr(pandas_.DataFrame, 'shrink', shrink)
+
+def _has_strings(self, x, safe):
+    if infer_dtype(self, skipna=safe) != 'string':
+        return None
+
+    # Con NaN/None mezclados, 'has' tiene que fallar como 'x in nan': se deja para el camino elemento a elemento.
+    if not safe and self.isna().any():
+        return None
+
+    return self.str.contains(x, regex=False).fillna(False).astype(bool)
+
+def _has(self, x, safe):
+    if len(self) and isinstance(x, str):
+        result = _has_strings(self, x, safe)
+        if result is not None:
+            return result
+
+    values = self.to_numpy(dtype=object)
+    if safe:
+        # '__contains__' se busca una vez por tipo, no una vez por elemento.
+        contains = {}
+        for t in set(map(type, values)):
+            contains[t] = hasattr(t, '__contains__')
+        result = (contains[type(y)] and x in y for y in values)
+    else:
+        result = (x in y for y in values)
+
+    return pandas_.Series(np.fromiter(result, dtype=bool, count=len(values)), index=self.index, name=self.name)
+
+setattr(Series_, 'has', lambda self, x: _has(self, x, safe=False))
+setattr(Series_, 'has_safe', lambda self, x: _has(self, x, safe=True))
+
+from .parallel import parallel_apply, parallel_groupby_apply
+
+setattr(pandas_.DataFrame, 'parallel_apply', parallel_apply)
+setattr(Series_, 'parallel_apply', parallel_apply)
+setattr(pandas_.DataFrame, 'parallel_groupby_apply', parallel_groupby_apply)
 
 def __getattr__(name):
     return getattr(pandas_, name)
\ No newline at end of file
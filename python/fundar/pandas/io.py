@@ -0,0 +1,400 @@
+import pandas as pandas_
+import numpy as np
+import csv as csv_
+import gzip
+import json
+import os
+from glob import glob, escape as glob_escape
+from hashlib import sha1
+from importlib.util import find_spec
+from copy import copy
+from inspect import signature
+from itertools import chain, repeat
+from pandas.api.types import infer_dtype
+from ..parallelization import Executor, batches
+from .memory import shrink as shrink_
+
+original_to_csv = copy(pandas_.DataFrame.to_csv)
+
+formato_fundar = {
+    'encoding': 'utf-8',
+    'sep': ',',
+    'quoting': csv_.QUOTE_ALL,
+    'quotechar': '"',
+    'lineterminator': '\n',
+    'decimal': '.',
+    'index': False,
+    'float_format': '%.5f'
+}
+
+CHUNKSIZE = 100_000
+
+_TO_CSV_PARAMETERS = set(signature(original_to_csv).parameters) - {'self', 'path_or_buf'}
+
+# Opciones con las que el CSV se puede armar columna por columna sin pasar por el writer de pandas.
+_FAST_OPTIONS = {'encoding', 'sep', 'quoting', 'quotechar', 'lineterminator', 'decimal', 'index', 'float_format', 'na_rep'}
+
+def _quote_column(values, kind, options):
+    q = options['quotechar']
+    field = q.replace('%', '%%') + '%s' + q.replace('%', '%%')
+    na = field % options.get('na_rep', '')
+
+    match kind:
+        case 'f':
+            float_field = field.replace('%s', options['float_format'])
+            formatted = [float_field % x for x in values.tolist()]
+            if options['decimal'] != '.':
+                formatted = [x.replace('.', options['decimal']) for x in formatted]
+            for i in np.flatnonzero(np.isnan(values)).tolist():
+                formatted[i] = na
+            return formatted
+        case 'i' | 'u' | 'b':
+            return [field % x for x in values.tolist()]
+        case _:
+            return [na if x is None or x != x else field % x.replace(q, q + q) for x in values.tolist()]
+
+# Unidades de `np.datetime_as_string`: sólo la fecha, segundos, milisegundos, microsegundos o nanosegundos.
+_DATE_UNITS = {'D': 86_400 * 10**9, 's': 10**9, 'ms': 10**6, 'us': 10**3, 'ns': 1}
+
+def _date_unit(values):
+    """
+    La unidad más gruesa que representa todos los valores, como decide pandas para una columna entera
+    ('2020-01-01' si son todas a medianoche, '2020-01-01 10:30:00' si no hay fracciones de segundo, etc.).
+    """
+    nanoseconds = values[~np.isnat(values)].astype('datetime64[ns]').view('i8')
+    return next(unit for unit, size in _DATE_UNITS.items() if not (nanoseconds % size).any())
+
+def _date_units(data):
+    """
+    Unidad de cada columna de fechas (sin zona horaria) de `data`, por posición, decidida sobre la columna completa.
+    Si `data` es un iterable de bloques no se puede ver todo antes de escribir: se devuelve None y se usan microsegundos.
+    """
+    if not isinstance(data, pandas_.DataFrame):
+        return None
+    return {i: _date_unit(data.iloc[:, i].to_numpy()) for i, dtype in enumerate(data.dtypes) if _is_naive_datetime(dtype)}
+
+def _is_naive_datetime(dtype):
+    return isinstance(dtype, np.dtype) and dtype.kind == 'M'
+
+def _format_dates(values, unit):
+    formatted = np.array([x.replace('T', ' ', 1) for x in np.datetime_as_string(values, unit=unit).tolist()], dtype=object)
+    formatted[np.isnat(values)] = np.nan
+    return formatted
+
+def _fast_chunk(chunk, header, options, date_units):
+    """
+    Arma el CSV de `chunk` a mano, formateando cada columna en una sola pasada.
+    Sólo cubre QUOTE_ALL sin índice y columnas float, int, bool, fecha o string; si no, devuelve None.
+    """
+    if not set(options) <= _FAST_OPTIONS or options['quoting'] != csv_.QUOTE_ALL or options['index']:
+        return None
+    if not isinstance(options['float_format'], str) or isinstance(chunk.columns, pandas_.MultiIndex):
+        return None
+
+    columns = []
+    for i, dtype in enumerate(chunk.dtypes):
+        column = chunk.iloc[:, i]
+        if dtype.kind == 'f':
+            values, kind = column.to_numpy(dtype=float, na_value=np.nan), 'f'
+        elif isinstance(dtype, np.dtype) and dtype.kind in 'iub':
+            values, kind = column.to_numpy(), dtype.kind
+        elif dtype.kind == 'O' and infer_dtype(column, skipna=True) in ('string', 'empty'):
+            values, kind = column.to_numpy(dtype=object), 'O'
+        elif _is_naive_datetime(dtype):
+            values = column.to_numpy()
+            values, kind = _format_dates(values, date_units[i] if date_units is not None else 'us'), 'O'
+        elif dtype.kind == 'M':
+            # Con zona horaria pandas escribe siempre la fecha completa; no llevan separadores ni saltos de línea,
+            # así que se deja el formato a pandas y se corta por renglón.
+            text = original_to_csv(column.to_frame(), None, header=False, index=False, quoting=csv_.QUOTE_ALL,
+                                   quotechar=options['quotechar'], lineterminator='\n', na_rep=options.get('na_rep', ''))
+            columns.append(text.split('\n')[:-1])
+            continue
+        else:
+            return None
+        columns.append(_quote_column(values, kind, options))
+
+    sep, end = options['sep'], options['lineterminator']
+    lines = []
+    if header:
+        names = header if isinstance(header, list) else chunk.columns
+        q = options['quotechar']
+        lines.append(sep.join(q + str(name).replace(q, q + q) + q for name in names))
+    lines.extend(map(sep.join, zip(*columns)))
+    return end.join(lines) + end if lines else ''
+
+def _format_floats(values, float_format, decimal):
+    formatter = float_format if callable(float_format) else float_format.__mod__
+    formatted = np.array([formatter(x) for x in values.tolist()], dtype=object)
+    if decimal != '.':
+        formatted = np.array([x.replace('.', decimal) for x in formatted], dtype=object)
+
+    # Los faltantes quedan como NaN para que pandas escriba `na_rep`, igual que con float_format.
+    formatted[np.isnan(values)] = np.nan
+    return formatted
+
+def _format_chunk(chunk, header, options, date_units=None):
+    """
+    Devuelve el texto CSV de `chunk`.
+    Si no alcanza el camino rápido, las columnas float y de fechas se formatean antes y el writer de pandas sólo ve strings.
+    Las fechas usan la unidad de `date_units` (ver `_date_units`), así todos los bloques escriben la columna igual.
+    """
+    text = _fast_chunk(chunk, header, options, date_units)
+    if text is not None:
+        return text
+
+    float_format = options.get('float_format')
+    floats = [i for i, dtype in enumerate(chunk.dtypes) if dtype.kind == 'f'] if float_format is not None else []
+    dates = [i for i, dtype in enumerate(chunk.dtypes) if _is_naive_datetime(dtype)] if 'date_format' not in options else []
+    if floats or dates:
+        chunk = chunk.copy(deep=False)
+        for i in floats:
+            values = chunk.iloc[:, i].to_numpy(dtype=float, na_value=np.nan)
+            chunk.isetitem(i, _format_floats(values, float_format, options.get('decimal', '.')))
+        for i in dates:
+            chunk.isetitem(i, _format_dates(chunk.iloc[:, i].to_numpy(), date_units[i] if date_units is not None else 'us'))
+
+    options = {k: v for k, v in options.items() if k != 'encoding'}
+    return original_to_csv(chunk, None, header=header, **options)
+
+def _compression(path, compression):
+    if isinstance(compression, dict):
+        compression = dict(compression)
+        return compression.pop('method'), compression
+
+    if compression == 'infer':
+        path = str(path)
+        compression = 'gzip' if path.endswith('.gz') else 'zstd' if path.endswith('.zst') else None
+
+    return compression, {}
+
+def _open(path, compression, encoding, mode='w'):
+    method, options = _compression(path, compression)
+    mode = mode.replace('t', '').replace('b', '')
+    match method:
+        case None:
+            return open(path, mode, encoding=encoding, newline='')
+        case 'gzip':
+            return gzip.open(path, mode + 't', encoding=encoding, newline='', **({'compresslevel': 6} | options))
+        case 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                raise ImportError("Para escribir .zst hace falta 'zstandard' (pip install zstandard).") from None
+            level = options.pop('level', 3)
+            return zstandard.open(path, mode + 't', cctx=zstandard.ZstdCompressor(level=level, **options), encoding=encoding, newline='')
+        case _:
+            raise ValueError(f"Compresión no soportada: {method!r}. Las opciones son None, 'gzip' y 'zstd'.")
+
+def _chunks(data, chunksize):
+    if isinstance(data, pandas_.DataFrame):
+        return batches(data, chunksize) if len(data) else [data]
+    return data
+
+def to_fundar_csv(data, path_or_buf=None, chunksize: int = CHUNKSIZE, compression='infer', executor: type[Executor] = None, **kwargs):
+    """
+    Escribe `data` (un DataFrame o un iterable de DataFrames) en formato Fundar, de a bloques de `chunksize` filas.
+    Los floats se formatean por columna antes de pasar por el writer de pandas, que es lo que más tarda con `float_format`.
+    Las fechas se escriben como en `to_csv`, con un mismo formato para toda la columna; si `data` es un iterable de bloques,
+    siempre con microsegundos ('2020-01-01 00:00:00.000000'), salvo que se pase `date_format`.
+    `compression` puede ser 'infer' (por extensión: .gz, .zst), None, 'gzip', 'zstd' o un dict {'method': ..., **opciones}.
+    Con `executor` (por ejemplo Multiprocess) los bloques se formatean en los workers y se escriben en orden desde este proceso;
+    el resto de los kwargs que no son de `to_csv` se pasan a `executor.imap`.
+    Si `path_or_buf` es None devuelve el CSV como string.
+    """
+    to_csv_kwargs = {k: kwargs.pop(k) for k in list(kwargs) if k in _TO_CSV_PARAMETERS}
+    options = formato_fundar | to_csv_kwargs
+    header = options.pop('header', True)
+    mode = options.pop('mode', 'w')
+
+    date_units = _date_units(data)
+    chunks = _chunks(data, chunksize)
+    headers = chain([header], repeat(False))
+    if executor is None:
+        texts = map(_format_chunk, chunks, headers, repeat(options), repeat(date_units))
+    else:
+        if hasattr(chunks, '__len__'):
+            kwargs = {'total': len(chunks)} | kwargs
+        texts = executor.imap(_format_chunk, chunks, headers, repeat(options), repeat(date_units), **kwargs)
+
+    if path_or_buf is None:
+        return ''.join(texts)
+
+    if hasattr(path_or_buf, 'write'):
+        for text in texts:
+            path_or_buf.write(text)
+        return None
+
+    with _open(path_or_buf, compression, options['encoding'], mode) as f:
+        for text in texts:
+            f.write(text)
+
+SCHEMA_SUFFIX = '.schema.json'
+
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'fundar', 'pandas')
+
+_cache = {'directory': None, 'format': None}
+
+def enable_cache(directory: str = CACHE_DIR, format: str = 'feather'):
+    """
+    Activa el cache columnar: `read_fundar_csv` mantiene en `directory` un gemelo Parquet o Feather
+    de cada CSV, identificado por la ruta, el mtime y el tamaño del archivo.
+    El gemelo se arma con lo que devuelve una lectura completa del CSV, así que tiene su mismo contenido y dtypes.
+    """
+    if find_spec('pyarrow') is None:
+        raise ImportError("El cache columnar necesita 'pyarrow' (pip install pyarrow).")
+    if format not in ('feather', 'parquet'):
+        raise ValueError(f"Formato de cache no soportado: {format!r}. Las opciones son 'feather' y 'parquet'.")
+
+    os.makedirs(directory, exist_ok=True)
+    _cache.update(directory=str(directory), format=format)
+
+def disable_cache():
+    _cache.update(directory=None, format=None)
+
+def _twin_prefix(path):
+    return os.path.join(_cache['directory'], sha1(os.path.abspath(path).encode('utf-8')).hexdigest()[:16])
+
+def _version(path):
+    key = _file_key(path)
+    return f"{_twin_prefix(path)}-{key['mtime']}-{key['size']}"
+
+def _twin(path, engine) -> str | None:
+    # Cada engine infiere dtypes distintos (pyarrow ya parsea las fechas, por ejemplo): hay un gemelo por engine.
+    if _cache['directory'] is None or not isinstance(path, (str, os.PathLike)) or not os.path.exists(path):
+        return None
+    return f"{_version(path)}-{engine}.{_cache['format']}"
+
+def write_twin(path, frame, engine: str):
+    """
+    Guarda el gemelo columnar de `path` leído con `engine`, con el contenido de `frame`,
+    y borra los de versiones anteriores del archivo.
+    No hace nada si el cache no está activo o `path` no es una ruta.
+    """
+    twin = _twin(path, engine)
+    if twin is None:
+        return
+
+    frame = frame.reset_index(drop=True)
+    frame.columns = frame.columns.map(str)
+
+    current = _version(path) + '-'
+    for old in glob(glob_escape(_twin_prefix(path)) + '-*'):
+        if not old.startswith(current):
+            os.remove(old)
+
+    # Se escribe aparte y se renombra, para que un lector nunca vea un gemelo a medio escribir.
+    tmp = f'{twin}.{os.getpid()}.tmp'
+    if _cache['format'] == 'feather':
+        frame.to_feather(tmp, compression='uncompressed')
+    else:
+        frame.to_parquet(tmp, index=False)
+    os.replace(tmp, twin)
+
+def _read_twin(twin, columns):
+    if twin.endswith('.parquet'):
+        return pandas_.read_parquet(twin, columns=columns)
+
+    from pyarrow import feather
+    # Sin compresión, el Feather se mapea en memoria y las columnas se leen a demanda.
+    return feather.read_table(twin, columns=columns, memory_map=True).to_pandas()
+
+_READ_DIALECT = {'sep': ',', 'quotechar': '"', 'encoding': 'utf-8'}
+
+def _file_key(path):
+    stat = os.stat(path)
+    return {'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+
+def read_schema(path) -> dict | None:
+    """
+    Devuelve los dtypes guardados en el sidecar de `path` (`path + SCHEMA_SUFFIX`),
+    o None si no hay sidecar o si el archivo cambió desde que se escribió (mtime y tamaño).
+    """
+    try:
+        with open(str(path) + SCHEMA_SUFFIX, encoding='utf-8') as f:
+            sidecar = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+    if sidecar.get('file') != _file_key(path):
+        return None
+    return sidecar['dtypes']
+
+def write_schema(path, dtypes: dict):
+    with open(str(path) + SCHEMA_SUFFIX, 'w', encoding='utf-8') as f:
+        json.dump({'file': _file_key(path), 'dtypes': dtypes}, f, ensure_ascii=False, indent=2)
+
+def _schema_kwargs(dtypes, kwargs):
+    dtype = {column: t for column, t in dtypes.items() if not t.startswith('datetime64')}
+    dates = [column for column, t in dtypes.items() if t.startswith('datetime64')]
+
+    # Lo que pase el usuario tiene prioridad sobre el sidecar.
+    kwargs = dict(kwargs)
+    if isinstance(kwargs.get('dtype'), dict) or 'dtype' not in kwargs:
+        kwargs['dtype'] = dtype | (kwargs.get('dtype') or {})
+    if dates and 'parse_dates' not in kwargs:
+        kwargs['parse_dates'] = dates
+    return kwargs
+
+# Argumentos de `read_csv` que el engine pyarrow rechaza (o sólo acepta en parte, como `skiprows`).
+_PYARROW_UNSUPPORTED = {
+    'chunksize', 'comment', 'converters', 'dayfirst', 'dialect', 'float_precision', 'iterator', 'lineterminator',
+    'low_memory', 'memory_map', 'nrows', 'quoting', 'skipfooter', 'skipinitialspace', 'skiprows', 'thousands',
+}
+
+def _engine(engine, chunksize, kwargs):
+    if engine != 'auto':
+        return engine
+    if chunksize is not None or find_spec('pyarrow') is None:
+        return 'c'
+    if _PYARROW_UNSUPPORTED & kwargs.keys() or callable(kwargs.get('usecols')) or callable(kwargs.get('on_bad_lines')):
+        return 'c'
+    return 'pyarrow'
+
+def read_fundar_csv(path, columns: list = None, chunksize: int = None, engine: str = 'auto', schema: bool = False, shrink: bool = False, **kwargs):
+    """
+    Lee un CSV escrito con `formato_fundar`.
+    `columns` restringe las columnas leídas y `chunksize` devuelve un iterador de DataFrames.
+    Con engine='auto' se usa pyarrow si está instalado y acepta los argumentos pedidos (no acepta `chunksize`, `nrows`,
+    `skiprows`, `skipfooter`, etc.); si no, el engine C.
+    Si el cache columnar está activo (`enable_cache`) y el CSV no cambió, se lee el gemelo Parquet/Feather del mismo engine en su lugar;
+    si todavía no existe, se genera después de leer el CSV completo. Con `chunksize` u otros argumentos de `read_csv`
+    (`nrows`, `dtype`, `skiprows`...) el gemelo no se usa ni se escribe, porque no respetaría esos argumentos.
+    Con schema=True los dtypes se toman del sidecar `path + SCHEMA_SUFFIX` si sigue vigente (mismo mtime y tamaño),
+    así pandas no vuelve a inferirlos; lo que se infiera en una lectura completa (incluidas las fechas de `parse_dates`) se guarda en el sidecar.
+    Con shrink=True el resultado (o cada bloque) pasa por `shrink`; el sidecar y el gemelo guardan los dtypes sin reducir.
+    """
+    engine = _engine(engine, chunksize, kwargs)
+    # El gemelo tiene todas las columnas, así que sólo admite elegir `columns`.
+    twin = _twin(path, engine) if chunksize is None and not kwargs else None
+
+    kwargs = _READ_DIALECT | kwargs
+    if columns is not None:
+        kwargs['usecols'] = columns
+
+    if twin is not None and os.path.exists(twin):
+        frame = _read_twin(twin, columns)
+        return shrink_(frame) if shrink else frame
+
+    dtypes = read_schema(path) if schema else None
+    if dtypes:
+        if columns is not None:
+            dtypes = {column: t for column, t in dtypes.items() if column in columns}
+        kwargs = _schema_kwargs(dtypes, kwargs)
+
+    if chunksize is not None:
+        chunks = pandas_.read_csv(path, chunksize=chunksize, engine=engine, **kwargs)
+        return map(shrink_, chunks) if shrink else chunks
+
+    frame = pandas_.read_csv(path, engine=engine, **kwargs)
+
+    if schema:
+        stored = read_schema(path) or {}
+        dtypes = stored | {str(column): str(dtype) for column, dtype in frame.dtypes.items()}
+        if dtypes != stored:
+            write_schema(path, dtypes)
+
+    if twin is not None and columns is None:
+        write_twin(path, frame, engine)
+
+    return shrink_(frame) if shrink else frame
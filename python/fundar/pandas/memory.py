@@ -0,0 +1,82 @@
+import pandas as pandas_
+import numpy as np
+from importlib.util import find_spec
+from pandas.api.types import infer_dtype
+
+MAX_CATEGORY_RATIO = 0.5
+
+_SIGNED = [np.int8, np.int16, np.int32, np.int64]
+_UNSIGNED = [np.uint8, np.uint16, np.uint32, np.uint64]
+
+def _smallest_integer(values):
+    # Como pd.to_numeric(downcast=...): los enteros con signo siguen con signo y los sin signo, sin signo.
+    if not len(values):
+        return values.dtype
+
+    low, high = values.min(), values.max()
+    for dtype in _UNSIGNED if values.dtype.kind == 'u' else _SIGNED:
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return np.dtype(dtype)
+    return values.dtype
+
+def _arrow_strings():
+    if find_spec('pyarrow') is None:
+        return None
+    try:
+        # Mismo manejo de faltantes (NaN) que el dtype 'str'/object del que viene la columna.
+        return pandas_.StringDtype('pyarrow', na_value=np.nan)
+    except TypeError:
+        return pandas_.StringDtype('pyarrow')
+
+def _shrunk_dtype(column, max_category_ratio, strings):
+    dtype = column.dtype
+
+    if isinstance(dtype, np.dtype) and dtype.kind in 'iu':
+        return _smallest_integer(column.to_numpy())
+
+    if isinstance(dtype, np.dtype) and dtype.kind == 'f' and dtype.itemsize > 4:
+        values = column.to_numpy()
+        # Sólo si float32 representa exactamente todos los valores.
+        if np.array_equal(values.astype(np.float32).astype(dtype), values, equal_nan=True):
+            return np.dtype(np.float32)
+        return dtype
+
+    if dtype.kind == 'O' and infer_dtype(column, skipna=True) == 'string':
+        if len(column) and column.nunique() <= max_category_ratio * len(column):
+            return 'category'
+        if strings is not None and dtype != strings:
+            return strings
+
+    return dtype
+
+def shrink(self, report: bool = False, max_category_ratio: float = MAX_CATEGORY_RATIO, arrow_strings: bool = True):
+    """
+    Devuelve una copia de `self` que ocupa menos memoria:
+    los enteros pasan al tipo más chico (del mismo signo) que los contiene, los float64 a float32 si no se pierde nada,
+    las columnas de texto con pocos valores distintos (hasta `max_category_ratio` de las filas) a 'category'
+    y el resto del texto, si está pyarrow y `arrow_strings`, a strings respaldados por Arrow.
+    Con report=True devuelve también un DataFrame con dtype y bytes de cada columna antes y después.
+    """
+    strings = _arrow_strings() if arrow_strings else None
+
+    dtypes = {}
+    for i, column in enumerate(self.columns):
+        dtype = _shrunk_dtype(self.iloc[:, i], max_category_ratio, strings)
+        if dtype != self.dtypes.iloc[i]:
+            dtypes[column] = dtype
+
+    result = self.astype(dtypes) if dtypes else self.copy()
+
+    if not report:
+        return result
+
+    before, after = self.memory_usage(index=False, deep=True), result.memory_usage(index=False, deep=True)
+    summary = pandas_.DataFrame({
+        'before_dtype': self.dtypes.astype(str),
+        'after_dtype': result.dtypes.astype(str),
+        'before_bytes': before,
+        'after_bytes': after,
+    })
+    summary.loc['total'] = ['', '', before.sum(), after.sum()]
+    return result, summary
@@ -0,0 +1,81 @@
+import pandas as pandas_
+from functools import partial
+from os import cpu_count
+from inspect import signature
+from pandas.core.groupby import DataFrameGroupBy
+from ..parallelization import Executor, Multiprocess
+
+MIN_ROWS = 10_000
+
+# Desde pandas 2.2 `apply` puede excluir las columnas de `by` (en pandas 3 siempre las excluye); antes siempre las pasa.
+_INCLUDE_GROUPS = {'include_groups': False} if 'include_groups' in signature(DataFrameGroupBy.apply).parameters else {}
+
+def _partitions(partitions, tqdm_kwargs):
+    return partitions or 4 * (tqdm_kwargs.get('max_workers') or cpu_count() or 1)
+
+def _apply(part, func, **kwargs):
+    return part.apply(func, **kwargs)
+
+def _apply_groups(groups, func):
+    return [func(group) for group in groups]
+
+def _concat(results):
+    return pandas_.concat(results, axis=1 if isinstance(results[0], pandas_.DataFrame) else 0)
+
+def parallel_apply(self, func, axis=0, executor: type[Executor] = Multiprocess, partitions: int = None, min_rows: int = MIN_ROWS, **tqdm_kwargs):
+    """
+    `apply` repartido entre los workers de `executor`.
+    Con axis=1 (o sobre una Series) se parte por filas; con axis=0 (DataFrame), por columnas.
+    Los resultados se concatenan en el orden original. Por debajo de `min_rows` filas se usa el `apply` de siempre.
+    Con Multiprocess, `func` tiene que poder serializarse (funciones de módulo, no lambdas).
+    """
+    is_frame = isinstance(self, pandas_.DataFrame)
+    kwargs = {'axis': axis} if is_frame else {}
+
+    if len(self) < min_rows or (is_frame and not self.shape[1]):
+        return self.apply(func, **kwargs)
+
+    n = _partitions(partitions, tqdm_kwargs)
+    
+    if is_frame and axis in (0, 'index'):
+        size = -(-self.shape[1] // n)
+        parts = [self.iloc[:, i:i + size] for i in range(0, self.shape[1], size)]
+        results = executor.map(partial(_apply, func=func, **kwargs), parts, **({'chunksize': 1} | tqdm_kwargs))
+        return _concat(results)
+
+    batch_size = -(-len(self) // n)
+    return executor.map_batches(partial(_apply, func=func, **kwargs), self, batch_size, **tqdm_kwargs)
+
+def parallel_groupby_apply(self, by, func, executor: type[Executor] = Multiprocess, partitions: int = None, min_rows: int = MIN_ROWS, **tqdm_kwargs):
+    """
+    `groupby(by).apply(func)` repartido entre los workers de `executor`.
+    Los grupos se reparten en particiones contiguas de tamaño (en filas) parecido y se ejecutan en el orden de `groupby`.
+    `func` recibe los mismos grupos que en `apply` y los resultados se combinan con el propio `apply`,
+    así que el resultado es el mismo que el de `groupby(by).apply(func)`.
+    Desde pandas 2.2 los grupos no incluyen las columnas de `by` (como `apply(func, include_groups=False)`); antes, sí.
+    Por debajo de `min_rows` filas se usa el `groupby(...).apply` de siempre.
+    """
+    grouped = self.groupby(by, sort=True)
+
+    if len(self) < min_rows or not len(grouped):
+        return grouped.apply(func, **_INCLUDE_GROUPS)
+
+    exclusions = [column for column in grouped.exclusions if column in self.columns] if _INCLUDE_GROUPS else []
+    groups = [group.drop(columns=exclusions) for _, group in grouped]
+
+    target = -(-len(self) // _partitions(partitions, tqdm_kwargs))
+    batches, batch, rows = [], [], 0
+    for group in groups:
+        batch.append(group)
+        rows += len(group)
+        if rows >= target:
+            batches.append(batch)
+            batch, rows = [], 0
+    if batch:
+        batches.append(batch)
+
+    results = executor.map(partial(_apply_groups, func=func), batches, **({'chunksize': 1} | tqdm_kwargs))
+    results = iter([result for batch in results for result in batch])
+
+    # `apply` recorre los grupos en el mismo orden: devolviendo los resultados ya calculados, los combina como lo haría con `func`.
+    return grouped.apply(lambda _: next(results), **_INCLUDE_GROUPS)
@@ -1,17 +1,32 @@
-from typing import Callable, Iterable, TypeVar, Any
+from typing import Callable, Iterable, Iterator, TypeVar, Any
+from os import cpu_count
 from .pools import *
+from .coroutines import *
+from .ratelimit import RateLimiter
+from .shared import SharedArray, SharedFrame, share
 
 A = TypeVar('A')
 B = TypeVar('B')
 class Executor:
     run_all: Callable
     run_map: Callable
+    run_imap: Callable
+    pool: Pool = None
+
+    @classmethod
+    def bind(cls, pool: Pool) -> type['Executor']:
+        """
+        Returns a version of this executor that runs on `pool` instead of starting a new pool on every call.
+        """
+        return type(cls.__name__, (cls,), {'pool': pool})
 
     @classmethod
     def execute(cls, fs: Iterable[Callable[[], A]], **tqdm_kwargs) -> list[A]:
         """
         Executes a list of functions with void arguments and returns their results in order.
         """
+        if cls.pool is not None:
+            return pool_run_all(cls.pool, fs, **tqdm_kwargs)
         return cls.run_all(fs, **tqdm_kwargs)
 
     @classmethod
@@ -19,7 +34,40 @@ class Executor:
         """
         Maps and executes a function over variadic arguments and returns the results in order.
         """
+        if cls.pool is not None:
+            return pool_map(cls.pool, fn, *iterables, **tqdm_kwargs)
         return cls.run_map(fn, *iterables, **tqdm_kwargs)
+
+    @classmethod
+    def map_batches(cls, fn: Callable[[Any], Any], data: Any, batch_size: int = None, **tqdm_kwargs) -> Any:
+        """
+        Calls `fn` once per slice of `data` (list, tuple, numpy array, pandas Series/DataFrame...) instead of once per element.
+        `fn` must return one result per element of its slice; the results are concatenated in order.
+        By default `data` is split into 4 slices per worker.
+        """
+        max_workers = tqdm_kwargs.get("max_workers", min(32, (cpu_count() or 1) + 4))
+        batch_size = batch_size or max(1, -(-len(data) // (4 * max_workers)))
+        slices = batches(data, batch_size)
+        return concat(cls.map(fn, slices, **({"chunksize": 1} | tqdm_kwargs)))
+
+    @classmethod
+    def imap(cls, fn: Callable[[A], B], *iterables: A, **tqdm_kwargs) -> Iterator[B]:
+        """
+        Lazily maps a function over variadic iterables (which may be unbounded generators), 
+        keeping at most `max_in_flight` tasks submitted and yielding the results in order.
+        """
+        if cls.pool is not None:
+            return pool_imap(cls.pool, fn, *iterables, ordered=True, **tqdm_kwargs)
+        return cls.run_imap(fn, *iterables, ordered=True, **tqdm_kwargs)
+
+    @classmethod
+    def imap_unordered(cls, fn: Callable[[A], B], *iterables: A, **tqdm_kwargs) -> Iterator[B]:
+        """
+        Same as `imap`, but yields the results as soon as they are completed.
+        """
+        if cls.pool is not None:
+            return pool_imap(cls.pool, fn, *iterables, ordered=False, **tqdm_kwargs)
+        return cls.run_imap(fn, *iterables, ordered=False, **tqdm_kwargs)
     
 class Multithread(Executor):
     """
@@ -28,6 +76,8 @@ class Multithread(Executor):
 
     run_all = thread_run_all
     run_map = thread_map
+    run_imap = thread_imap
+    Pool = ThreadPool
 
 class Multiprocess(Executor):
     """
@@ -35,10 +85,50 @@ class Multiprocess(Executor):
     """
     run_all = process_run_all
     run_map = process_map
+    run_imap = process_imap
+    Pool = ProcessPool
 
 class Sequentially(Executor):
     """
     Executes actions sequentially (single-thread, single-process).
     """
     run_all = seq_run_all
-    run_map = seq_map
\ No newline at end of file
+    run_map = seq_map
+    run_imap = seq_imap
+
+    @classmethod
+    def bind(cls, pool: Pool) -> type[Executor]:
+        """
+        Sequential execution doesn't use pools: returns the executor unchanged.
+        """
+        return cls
+
+class Async(Executor):
+    """
+    Executes coroutine functions concurrently on an event loop (plain functions run in threads).
+    Accepts `max_concurrency` (alias `max_workers`), `rate` (calls per second) and `burst`.
+    The synchronous methods can be called even from inside a running loop; 
+    from async code, await `execute_async`/`map_async` or iterate `imap_async` instead.
+    """
+    run_all = async_run_all
+    run_map = async_map
+    run_imap = async_imap
+
+    @classmethod
+    def bind(cls, pool: Pool) -> type[Executor]:
+        """
+        The event loop doesn't use pools: returns the executor unchanged.
+        """
+        return cls
+
+    @classmethod
+    async def execute_async(cls, fs: Iterable[Callable[[], A]], **tqdm_kwargs) -> list[A]:
+        return await async_run_all_coroutine(fs, **tqdm_kwargs)
+
+    @classmethod
+    async def map_async(cls, fn: Callable[[A], B], *iterables: A, **tqdm_kwargs) -> list[B]:
+        return await async_map_coroutine(fn, *iterables, **tqdm_kwargs)
+
+    @classmethod
+    def imap_async(cls, fn: Callable[[A], B], *iterables: A, ordered: bool = True, **tqdm_kwargs):
+        return async_imap_coroutine(fn, *iterables, ordered=ordered, **tqdm_kwargs)
@@ -0,0 +1,134 @@
+from tqdm.auto import tqdm as tqdm_auto
+from concurrent.futures import ThreadPoolExecutor
+from inspect import iscoroutinefunction, isawaitable
+from itertools import islice
+from .ratelimit import RateLimiter
+import asyncio
+
+def _async_options(tqdm_kwargs, iterables=None):
+    """
+    Splits the keyword arguments of the async runners into (tqdm_class, max_concurrency, limiter, tqdm kwargs).
+
+    Parameters
+    ----------
+    tqdm_class  : [default: tqdm.auto.tqdm].
+    max_concurrency  : maximum number of calls awaited at once (alias: max_workers) [default: 32].
+    rate  : maximum calls started per second [default: None (unlimited)].
+    burst  : calls that can be started at once before `rate` applies [default: 1].
+    """
+    kwargs = tqdm_kwargs.copy()
+
+    if "total" not in kwargs and iterables is not None and all(hasattr(it, '__len__') for it in iterables):
+        kwargs["total"] = min(map(len, iterables), default=0)
+
+    tqdm_class = kwargs.pop("tqdm_class", tqdm_auto)
+    max_concurrency = kwargs.pop("max_concurrency", kwargs.pop("max_workers", 32))
+    rate = kwargs.pop("rate", None)
+    burst = kwargs.pop("burst", 1)
+    for key in ("chunksize", "lock_name", "max_in_flight"):
+        kwargs.pop(key, None)
+
+    limiter = RateLimiter(rate, burst) if rate else None
+    return tqdm_class, max_concurrency, limiter, kwargs
+
+async def _call(fn, *args):
+    """
+    Awaits coroutine functions directly; runs plain functions in a thread, awaiting their result if needed.
+    """
+    if iscoroutinefunction(fn):
+        return await fn(*args)
+
+    result = await asyncio.to_thread(fn, *args)
+    return await result if isawaitable(result) else result
+
+async def _limited(fn, args, semaphore, limiter, bar):
+    async with semaphore:
+        if limiter is not None:
+            await limiter.acquire_async()
+        result = await _call(fn, *args)
+    bar.update(1)
+    return result
+
+async def async_run_all_coroutine(fs, **tqdm_kwargs):
+    fs = list(fs)
+    tqdm_class, max_concurrency, limiter, kwargs = _async_options(tqdm_kwargs, [fs])
+    semaphore = asyncio.Semaphore(max_concurrency)
+    with tqdm_class(**kwargs) as bar:
+        return await asyncio.gather(*(_limited(f, (), semaphore, limiter, bar) for f in fs))
+
+async def async_map_coroutine(fn, *iterables, **tqdm_kwargs):
+    tqdm_class, max_concurrency, limiter, kwargs = _async_options(tqdm_kwargs, iterables)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    with tqdm_class(**kwargs) as bar:
+        return await asyncio.gather(*(_limited(fn, args, semaphore, limiter, bar) for args in zip(*iterables)))
+
+async def async_imap_coroutine(fn, *iterables, ordered=True, **tqdm_kwargs):
+    """
+    Async generator version of `imap`: keeps at most `max_in_flight` calls scheduled
+    [default: 2 * max_concurrency], of which at most `max_concurrency` run at once.
+    """
+    tqdm_class, max_concurrency, limiter, kwargs = _async_options(tqdm_kwargs, iterables)
+    semaphore = asyncio.Semaphore(max_concurrency)
+    max_in_flight = tqdm_kwargs.get("max_in_flight", 2 * max_concurrency)
+    tasks = zip(*iterables)
+    pending = []
+
+    def submit(n):
+        for args in islice(tasks, n):
+            pending.append(asyncio.ensure_future(_limited(fn, args, semaphore, limiter, bar)))
+
+    with tqdm_class(**kwargs) as bar:
+        try:
+            submit(max_in_flight)
+            while pending:
+                if ordered:
+                    done = [pending.pop(0)]
+                    await done[0]
+                else:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    pending[:] = [f for f in pending if f not in done]
+
+                submit(len(done))
+                for f in done:
+                    yield f.result()
+        finally:
+            for f in pending:
+                f.cancel()
+
+def _run(coroutine):
+    """
+    Runs a coroutine to completion from synchronous code.
+    If there is already a running event loop in this thread (e.g. Jupyter), it runs on a new loop in another thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        return ex.submit(asyncio.run, coroutine).result()
+
+def async_run_all(fs, **tqdm_kwargs):
+    return _run(async_run_all_coroutine(fs, **tqdm_kwargs))
+
+def async_map(fn, *iterables, **tqdm_kwargs):
+    return _run(async_map_coroutine(fn, *iterables, **tqdm_kwargs))
+
+def async_imap(fn, *iterables, ordered=True, **tqdm_kwargs):
+    """
+    Synchronous iterator over `async_imap_coroutine`, driven by an event loop in a helper thread.
+    """
+    loop = asyncio.new_event_loop()
+    results = async_imap_coroutine(fn, *iterables, ordered=ordered, **tqdm_kwargs)
+
+    with ThreadPoolExecutor(max_workers=1) as ex:
+        ex.submit(asyncio.set_event_loop, loop).result()
+        try:
+            while True:
+                try:
+                    yield ex.submit(loop.run_until_complete, results.__anext__()).result()
+                except StopAsyncIteration:
+                    return
+        finally:
+            ex.submit(loop.run_until_complete, results.aclose()).result()
+            ex.submit(loop.close).result()
@@ -1,7 +1,11 @@
 from tqdm.contrib.concurrent import ensure_lock, thread_map as _thread_map, process_map as _process_map
 from tqdm.auto import tqdm as tqdm_auto
 from functools import wraps
+from timeit import default_timer
 from os import cpu_count
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+from itertools import islice, chain
 from concurrent.futures.process import BrokenProcessPool
 import sys
 
@@ -63,15 +67,54 @@ def thread_run_all(fs, **tqdm_kwargs):
 
 thread_map = _thread_map
 
+PROBE_SIZE = 8
+CHUNK_SECONDS = 0.05
+
+def _probe_chunk(fn, chunk):
+    """
+    Runs `fn` over `chunk` in a worker, stopping once CHUNK_SECONDS have passed.
+    Returns the results (possibly fewer than `chunk`) and the time per item.
+    """
+    results = []
+    start = default_timer()
+    for args in chunk:
+        results.append(fn(*args))
+        if default_timer() - start > CHUNK_SECONDS:
+            break
+    return results, (default_timer() - start) / max(1, len(results))
+
+def _chunksize(per_item, remaining, max_workers):
+    """
+    Chunk size so that each chunk takes about CHUNK_SECONDS, while still leaving at least 4 chunks per worker.
+    """
+    limits = []
+    if per_item > 0:
+        limits.append(int(CHUNK_SECONDS / per_item))
+    if remaining is not None:
+        limits.append(-(-remaining // (4 * max_workers)))
+    return max(1, min(limits, default=1))
+
 @wraps(_process_map)
 def process_map(*args, **kwargs):
-    try:
-        return _process_map(*args, **kwargs)
-    except BrokenProcessPool:
-        raise BROKEN_POOL_WIN_EXCEPTION
+    """
+    tqdm's `process_map`, but if `chunksize` isn't given it is chosen from the input length
+    and a timing probe of the first items (which run in one of the workers).
+    """
+    if "chunksize" in kwargs:
+        try:
+            return _process_map(*args, **kwargs)
+        except BrokenProcessPool:
+            raise BROKEN_POOL_WIN_EXCEPTION
+    return list(_process_imap(*args, **kwargs, chunksize=None))
 
-def seq_run_all(fs, **tqdm_kwargs):
+def _seq_kwargs(tqdm_kwargs):
     kwargs = tqdm_kwargs.copy()
+    for key in ("max_workers", "chunksize", "lock_name"):
+        kwargs.pop(key, None)
+    return kwargs
+
+def seq_run_all(fs, **tqdm_kwargs):
+    kwargs = _seq_kwargs(tqdm_kwargs)
 
     if "total" not in kwargs:
         kwargs["total"] = len(fs)
@@ -81,12 +124,289 @@ def seq_run_all(fs, **tqdm_kwargs):
     return list(tqdm_class([f() for f in fs], **kwargs))
 
 def seq_map(fs, *iterables, **tqdm_kwargs):
+    kwargs = _seq_kwargs(tqdm_kwargs)
+
+    if "total" not in kwargs and all(hasattr(it, '__len__') for it in iterables):
+        kwargs["total"] = min(map(len, iterables), default=0)
+
+    tqdm_class = kwargs.pop("tqdm_class", tqdm_auto)
+
+
+    return list(tqdm_class(map(fs, *iterables), **kwargs))
+
+def _initialize_worker(tqdm_class, lock, initializer, initargs):
+    tqdm_class.set_lock(lock)
+    if initializer is not None:
+        initializer(*initargs)
+
+def _noop():
+    pass
+
+class Pool:
+    """
+    Long-lived pool of workers, reusable across `Executor` calls.
+
+    The underlying `PoolExecutor` is started lazily on first use (or explicitly with `start`/`warm_up`)
+    and shut down with `close` or when leaving a `with` block. `initializer(*initargs)` runs once in
+    each worker when it starts (e.g. to import heavy modules or load shared data).
+
+    Parameters
+    ----------
+    max_workers  : [default: min(32, cpu_count() + 4)].
+    initializer  : [default: None].
+    initargs  : [default: ()].
+    tqdm_class  : [default: tqdm.auto.tqdm].
+    """
+    PoolExecutor: type = None
+
+    def __init__(self, max_workers=None, initializer=None, initargs=(), tqdm_class=tqdm_auto):
+        self.max_workers = max_workers or min(32, cpu_count() + 4)
+        self.initializer = initializer
+        self.initargs = initargs
+        self.tqdm_class = tqdm_class
+        self._executor = None
+
+    @property
+    def executor(self):
+        return self.start()._executor
+
+    @property
+    def started(self) -> bool:
+        return self._executor is not None
+
+    def start(self):
+        if self._executor is None:
+            self._executor = self.PoolExecutor(
+                max_workers=self.max_workers,
+                initializer=_initialize_worker,
+                initargs=(self.tqdm_class, self.tqdm_class.get_lock(), self.initializer, self.initargs))
+        return self
+
+    def warm_up(self):
+        """
+        Starts every worker (running the initializer) before the first real task.
+        """
+        for f in [self.executor.submit(_noop) for _ in range(self.max_workers)]:
+            f.result()
+        return self
+
+    def close(self, wait=True):
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+    def __repr__(self):
+        state = 'started' if self.started else 'idle'
+        return f'{type(self).__name__}(max_workers={self.max_workers}, {state})'
+
+class ThreadPool(Pool):
+    """
+    Persistent pool of threads.
+    """
+    PoolExecutor = ThreadPoolExecutor
+
+class ProcessPool(Pool):
+    """
+    Persistent pool of processes.
+    """
+    PoolExecutor = ProcessPoolExecutor
+
+def _pool_kwargs(tqdm_kwargs):
     kwargs = tqdm_kwargs.copy()
+    for key in ("max_workers", "lock_name"):
+        kwargs.pop(key, None)
+    return kwargs
+
+def _pool_run_all(pool, fs, **tqdm_kwargs):
+    kwargs = _pool_kwargs(tqdm_kwargs)
+    kwargs.pop("chunksize", None)
+
+    if "total" not in kwargs:
+        kwargs["total"] = len(fs)
+
+    tqdm_class = kwargs.pop("tqdm_class", pool.tqdm_class)
+    futures = [pool.executor.submit(func) for func in fs]
+    return [f.result() for f in tqdm_class(futures, **kwargs)]
+
+def _pool_map(pool, fn, *iterables, **tqdm_kwargs):
+    kwargs = _pool_kwargs(tqdm_kwargs)
 
     if "total" not in kwargs:
-        kwargs["total"] = len(iterables)
+        kwargs["total"] = min(map(len, iterables), default=0) if all(hasattr(it, '__len__') for it in iterables) else None
+
+    tqdm_class = kwargs.pop("tqdm_class", pool.tqdm_class)
+    chunksize = kwargs.pop("chunksize", 1)
+    return list(tqdm_class(pool.executor.map(fn, *iterables, chunksize=chunksize), **kwargs))
+
+@wraps(_pool_run_all)
+def pool_run_all(*args, **kwargs):
+    try:
+        return _pool_run_all(*args, **kwargs)
+    except BrokenProcessPool:
+        raise BROKEN_POOL_WIN_EXCEPTION
+
+@wraps(_pool_map)
+def pool_map(pool, *args, **kwargs):
+    if isinstance(pool, ProcessPool) and "chunksize" not in kwargs:
+        return list(_pool_imap(pool, *args, **kwargs, chunksize=None))
+    try:
+        return _pool_map(pool, *args, **kwargs)
+    except BrokenProcessPool:
+        raise BROKEN_POOL_WIN_EXCEPTION
+
+
+def _run_chunk(fn, chunk):
+    return [fn(*args) for args in chunk]
+
+def _imap_on(ex, fn, iterables, ordered, max_in_flight, chunksize, bar, max_workers):
+    """
+    Keeps at most `max_in_flight` chunks submitted to `ex`, yielding results as they are ready.
+    With `chunksize=None`, the first PROBE_SIZE items are timed in a worker and the chunk size is chosen from that.
+    """
+    tasks = zip(*iterables)
+
+    if chunksize is None:
+        head = list(islice(tasks, PROBE_SIZE))
+        if not head:
+            return
+        results, per_item = ex.submit(_probe_chunk, fn, head).result()
+        bar.update(len(results))
+        yield from results
+
+        tasks = chain(head[len(results):], tasks)
+        remaining = bar.total - len(results) if bar.total is not None else None
+        chunksize = _chunksize(per_item, remaining, max_workers)
+
+    chunks = iter(lambda: list(islice(tasks, chunksize)), [])
+    pending = deque() if ordered else set()
+
+    def submit(n):
+        for chunk in islice(chunks, n):
+            f = ex.submit(_run_chunk, fn, chunk)
+            pending.append(f) if ordered else pending.add(f)
+
+    try:
+        submit(max_in_flight)
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                pending.difference_update(done)
+
+            submit(len(done))
+            for f in done:
+                results = f.result()
+                bar.update(len(results))
+                yield from results
+    finally:
+        for f in pending:
+            f.cancel()
+
+def _imap(PoolExecutor, fn, *iterables, ordered=True, pool=None, **tqdm_kwargs):
+    """
+    Implementation of `thread_imap`, `process_imap` and `pool_imap`.
+    Accepts any iterables (including generators) and yields results lazily.
+
+    Parameters
+    ----------
+    tqdm_class  : [default: tqdm.auto.tqdm].
+    max_workers  : [default: min(32, cpu_count() + 4)].
+    max_in_flight  : maximum number of chunks submitted at once [default: 2 * max_workers].
+    chunksize  : [default: 1]; None picks it from a timing probe of the first items.
+    lock_name  : [default: "":str].
+    """
+    kwargs = tqdm_kwargs.copy()
+
+    if "total" not in kwargs and all(hasattr(it, '__len__') for it in iterables):
+        kwargs["total"] = min(map(len, iterables), default=0)
+
+    tqdm_class = kwargs.pop("tqdm_class", pool.tqdm_class if pool else tqdm_auto)
+    max_workers = kwargs.pop("max_workers", pool.max_workers if pool else min(32, cpu_count() + 4))
+    max_in_flight = kwargs.pop("max_in_flight", 2 * max_workers)
+    chunksize = kwargs.pop("chunksize", 1)
+    lock_name = kwargs.pop("lock_name", "")
+
+    with tqdm_class(**kwargs) as bar:
+        if pool is not None:
+            yield from _imap_on(pool.executor, fn, iterables, ordered, max_in_flight, chunksize, bar, max_workers)
+            return
+
+        with ensure_lock(tqdm_class, lock_name=lock_name) as lk:
+            pool_kwargs = {'max_workers': max_workers, 'initializer': tqdm_class.set_lock, 'initargs': (lk,)}
+            with PoolExecutor(**pool_kwargs) as ex:
+                yield from _imap_on(ex, fn, iterables, ordered, max_in_flight, chunksize, bar, max_workers)
+
+def thread_imap(fn, *iterables, **tqdm_kwargs):
+    if "lock_name" not in tqdm_kwargs:
+        tqdm_kwargs = tqdm_kwargs | {"lock_name": "thread_lock"}
+    return _imap(ThreadPoolExecutor, fn, *iterables, **tqdm_kwargs)
+
+def _process_imap(fn, *iterables, **tqdm_kwargs):
+    if "lock_name" not in tqdm_kwargs:
+        tqdm_kwargs = tqdm_kwargs | {"lock_name": "mp_lock"}
+    try:
+        yield from _imap(ProcessPoolExecutor, fn, *iterables, **tqdm_kwargs)
+    except BrokenProcessPool:
+        raise BROKEN_POOL_WIN_EXCEPTION
+
+@wraps(_process_imap)
+def process_imap(*args, **kwargs):
+    return _process_imap(*args, **kwargs)
+
+def _pool_imap(pool, fn, *iterables, **tqdm_kwargs):
+    try:
+        yield from _imap(None, fn, *iterables, pool=pool, **_pool_kwargs(tqdm_kwargs))
+    except BrokenProcessPool:
+        raise BROKEN_POOL_WIN_EXCEPTION
+
+@wraps(_pool_imap)
+def pool_imap(*args, **kwargs):
+    return _pool_imap(*args, **kwargs)
+
+def seq_imap(fn, *iterables, ordered=True, **tqdm_kwargs):
+    kwargs = tqdm_kwargs.copy()
+
+    if "total" not in kwargs and all(hasattr(it, '__len__') for it in iterables):
+        kwargs["total"] = min(map(len, iterables), default=0)
 
     tqdm_class = kwargs.pop("tqdm_class", tqdm_auto)
+    for key in ("max_workers", "max_in_flight", "chunksize", "lock_name"):
+        kwargs.pop(key, None)
+
+    return iter(tqdm_class(map(fn, *iterables), **kwargs))
+
+
+def batches(data, batch_size):
+    """
+    Splits `data` into consecutive slices of `batch_size` elements.
+    pandas objects are sliced by position (`.iloc`), everything else with `data[i:j]`.
+    """
+    slicer = data.iloc if hasattr(data, 'iloc') else data
+    return [slicer[i:i + batch_size] for i in range(0, len(data), batch_size)]
+
+def concat(results):
+    """
+    Concatenates the per-batch results of `map_batches`, keeping their type when possible
+    (numpy arrays, pandas objects); anything else is flattened into a list.
+    """
+    results = list(results)
+    if not results:
+        return []
 
+    first = results[0]
+    module = type(first).__module__.split('.')[0]
 
-    return list(tqdm_class(map(fs, *iterables), **kwargs))
\ No newline at end of file
+    if module == 'numpy':
+        import numpy as np
+        return np.concatenate(results)
+    if module == 'pandas':
+        import pandas as pd
+        return pd.concat(results)
+    return [x for result in results for x in result]
@@ -0,0 +1,62 @@
+from time import monotonic, sleep
+from threading import Lock
+import asyncio
+
+class RateLimiter:
+    """
+    Token bucket: allows `rate` acquisitions per second on average, with bursts of up to `burst`.
+
+    Thread-safe. `acquire` blocks the calling thread until a token is available;
+    `acquire_async` waits without blocking the event loop. Each call reserves its token
+    immediately, so concurrent callers are spaced out instead of waking up together.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        if rate <= 0:
+            raise ValueError("'rate' must be positive.")
+        if burst < 1:
+            raise ValueError("'burst' must be at least 1.")
+
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = monotonic()
+        self._lock = Lock()
+
+    def _reserve(self) -> float:
+        """
+        Takes one token (possibly going into debt) and returns how long the caller has to wait for it.
+        """
+        with self._lock:
+            now = monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            return max(0.0, -self._tokens / self.rate)
+
+    def acquire(self):
+        delay = self._reserve()
+        if delay:
+            sleep(delay)
+
+    async def acquire_async(self):
+        delay = self._reserve()
+        if delay:
+            await asyncio.sleep(delay)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *_):
+        pass
+
+    async def __aenter__(self):
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, *_):
+        pass
+
+    def __repr__(self):
+        return f'{type(self).__name__}(rate={self.rate}, burst={self.burst})'
@@ -0,0 +1,220 @@
+from multiprocessing.shared_memory import SharedMemory
+import numpy as np
+
+class _SharedMemory(SharedMemory):
+    """
+    Arrays returned by `open` hold an export on the block's buffer, so closing it while they are alive fails:
+    the mapping is then released when the last of them is garbage-collected.
+    """
+    def close(self):
+        try:
+            super().close()
+        except BufferError:
+            pass
+
+    def __del__(self):
+        try:
+            self.close()
+        except OSError:
+            pass
+
+def _attach(name: str) -> SharedMemory:
+    """
+    Attaches to an existing block. Workers share the creator's resource tracker, so attaching doesn't
+    transfer the responsibility of unlinking it (on Python >= 3.13 it isn't even registered again).
+    """
+    try:
+        return _SharedMemory(name=name, track=False)
+    except TypeError:  # Python < 3.13
+        return _SharedMemory(name=name)
+
+class SharedArray:
+    """
+    NumPy array stored in a `multiprocessing.shared_memory` block.
+
+    Pickling it only sends the block name, shape, dtype and row range, so process workers attach
+    to the same memory instead of receiving a copy. Slicing (`handle[i:j]`, `split`) creates
+    lightweight handles over row ranges, which can be mapped over and also written to, for
+    reassembling results in the parent without copies:
+
+        out = SharedArray.empty(len(data), 'float64')
+        Multiprocess.map(work, share(data).split(8), out.split(8))  # work writes into out_part.open()
+        result = out.open()
+
+    The process that creates the block owns it and has to release it with `unlink`
+    (or by using the handle as a context manager).
+    """
+
+    def __init__(self, name: str, shape: tuple, dtype, start: int = 0, stop: int = None):
+        self.name = name
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.start = start
+        self.stop = self.shape[0] if stop is None else stop
+        self._shm = None
+        self._owner = False
+
+    @classmethod
+    def empty(cls, shape, dtype) -> 'SharedArray':
+        shape = (shape,) if isinstance(shape, int) else tuple(shape)
+        dtype = np.dtype(dtype)
+        if dtype.hasobject:
+            raise TypeError(f"Arrays of dtype '{dtype}' can't be placed in shared memory.")
+
+        size = max(1, int(np.prod(shape)) * dtype.itemsize)
+        shm = _SharedMemory(create=True, size=size)
+        handle = cls(shm.name, shape, dtype)
+        handle._shm = shm
+        handle._owner = True
+        return handle
+
+    @classmethod
+    def from_array(cls, array) -> 'SharedArray':
+        """
+        Copies `array` into a new shared block (the only copy that is made).
+        """
+        array = np.asarray(array)
+        handle = cls.empty(array.shape, array.dtype)
+        handle.open()[...] = array
+        return handle
+
+    def open(self) -> np.ndarray:
+        """
+        Returns the rows of this handle as an array backed by the shared block (no copy).
+        """
+        if self._shm is None:
+            self._shm = _attach(self.name)
+        # np.frombuffer keeps an export on the block's buffer, so it can't be unmapped while the array is alive.
+        count = int(np.prod(self.shape))
+        full = np.frombuffer(self._shm.buf, dtype=self.dtype, count=count).reshape(self.shape)
+        return full[self.start:self.stop]
+
+    def __array__(self, dtype=None, copy=None):
+        array = self.open()
+        return array if dtype is None else array.astype(dtype, copy=False)
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __getitem__(self, rows: slice) -> 'SharedArray':
+        if not isinstance(rows, slice) or rows.step not in (None, 1):
+            raise TypeError("Shared arrays can only be sliced by contiguous row ranges.")
+        start, stop, _ = rows.indices(len(self))
+        return type(self)(self.name, self.shape, self.dtype, self.start + start, self.start + max(start, stop))
+
+    def split(self, n: int) -> list['SharedArray']:
+        """
+        Splits the rows into `n` contiguous handles of (almost) the same size.
+        """
+        bounds = np.linspace(0, len(self), n + 1).astype(int)
+        return [self[i:j] for i, j in zip(bounds[:-1], bounds[1:])]
+
+    def close(self):
+        if self._shm is not None:
+            self._shm.close()
+            self._shm = None
+
+    def unlink(self):
+        """
+        Frees the shared block. Only the handle returned by `empty`/`from_array` (in the creating process) can do it.
+        """
+        if not self._owner:
+            raise RuntimeError("Only the handle that created the shared block can unlink it.")
+        self._shm.unlink()
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.unlink()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_shm'] = None
+        state['_owner'] = False
+        return state
+
+    def __repr__(self):
+        return f'{type(self).__name__}({self.name!r}, rows={self.start}:{self.stop}, shape={self.shape}, dtype={self.dtype})'
+
+class SharedFrame:
+    """
+    pandas DataFrame whose numeric, boolean and datetime columns live in shared memory (one `SharedArray` each).
+    Columns that can't be shared (objects, strings, categories, extension types) and the index
+    travel pickled, already sliced to the handle's rows.
+
+    `open()` rebuilds the DataFrame on top of the shared blocks without copying them.
+    Slicing and `split` work as in `SharedArray`, so `Multiprocess.map(fn, share(df).split(8))`
+    sends each worker only its partition's handles.
+    """
+
+    def __init__(self, columns: dict, index, start: int = 0, stop: int = None):
+        self.columns = columns
+        self.index = index
+        self.start = start
+        self.stop = len(index) if stop is None else stop
+
+    @classmethod
+    def from_frame(cls, df) -> 'SharedFrame':
+        columns = {}
+        for name, series in df.items():
+            dtype = series.dtype
+            if isinstance(dtype, np.dtype) and dtype.kind in 'biufcmM':
+                columns[name] = SharedArray.from_array(series.to_numpy())
+            else:
+                columns[name] = series.reset_index(drop=True)
+        return cls(columns, df.index)
+
+    @property
+    def shared(self) -> dict:
+        return {k: v for k, v in self.columns.items() if isinstance(v, SharedArray)}
+
+    def open(self):
+        import pandas as pd
+
+        # Unshared columns are passed as arrays, so that they aren't aligned against the index.
+        data = {name: column.open() if isinstance(column, SharedArray) else column.array
+                for name, column in self.columns.items()}
+        return pd.DataFrame(data, index=self.index, copy=False)
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __getitem__(self, rows: slice) -> 'SharedFrame':
+        if not isinstance(rows, slice) or rows.step not in (None, 1):
+            raise TypeError("Shared frames can only be sliced by contiguous row ranges.")
+        start, stop, _ = rows.indices(len(self))
+        stop = max(start, stop)
+        columns = {name: column[start:stop] if isinstance(column, SharedArray) else column.iloc[start:stop].reset_index(drop=True)
+                   for name, column in self.columns.items()}
+        return type(self)(columns, self.index[start:stop], self.start + start, self.start + stop)
+
+    def split(self, n: int) -> list['SharedFrame']:
+        bounds = np.linspace(0, len(self), n + 1).astype(int)
+        return [self[i:j] for i, j in zip(bounds[:-1], bounds[1:])]
+
+    def close(self):
+        for column in self.shared.values():
+            column.close()
+
+    def unlink(self):
+        for column in self.shared.values():
+            column.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.unlink()
+
+    def __repr__(self):
+        return f'{type(self).__name__}(rows={self.start}:{self.stop}, columns={list(self.columns)}, shared={list(self.shared)})'
+
+def share(data) -> SharedArray | SharedFrame:
+    """
+    Places a NumPy array or a pandas DataFrame in shared memory and returns its handle.
+    """
+    if hasattr(data, 'items') and hasattr(data, 'iloc') and hasattr(data, 'columns'):
+        return SharedFrame.from_frame(data)
+    return SharedArray.from_array(data)
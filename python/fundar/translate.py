@@ -1,10 +1,19 @@
 import re
-from time import sleep
+import os
+import sqlite3
+import unicodedata
+from threading import Lock
+from time import sleep, time
 import numpy.random as random
 
 import html
-import urllib.request
+import http.client
+import urllib.error
 import urllib.parse
+from functools import partial
+from queue import LifoQueue, Empty, Full
+
+from .parallelization import Multithread, RateLimiter
 
 agent = {
     'User-Agent':
@@ -21,31 +30,266 @@ agent = {
 CLASS_SELECTOR = re.compile(r'(?s)class="(?:t0|result-container)">(.*?)<')
 BASE_URL = "http://translate.google.com/m?tl={target}&sl={source}&q={text}"
 
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.cache', 'fundar', 'translate.sqlite')
+
+_SPACES = re.compile(r'\s+')
+
+def normalize(text: str) -> str:
+    """Forma con la que se guarda un texto en el cache: Unicode NFC, sin espacios en los extremos y con los internos colapsados."""
+    return _SPACES.sub(' ', unicodedata.normalize('NFC', text)).strip()
+
+class TranslationCache:
+    """
+    Cache persistente de traducciones en SQLite, por (texto normalizado, idioma de origen, idioma de destino).
+    Las entradas vencen a los `ttl` segundos (None: nunca) y, pasadas `max_entries`, se descartan las usadas hace más tiempo.
+    `hits` y `misses` cuentan las consultas hechas con esta instancia; `stats()` suma la cantidad de entradas.
+    Se puede compartir entre hilos.
+    """
+    def __init__(self, path: str = CACHE_PATH, ttl: float = None, max_entries: int = 100_000):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS translations ('
+            'text TEXT, source TEXT, target TEXT, result TEXT, created REAL, accessed REAL, '
+            'PRIMARY KEY (text, source, target))'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS translations_accessed ON translations (accessed)')
+
+    def __repr__(self):
+        return f'TranslationCache(path={self.path!r}, ttl={self.ttl}, max_entries={self.max_entries})'
+
+    def get(self, text, source, target) -> str | None:
+        key = (normalize(text), source, target)
+        now = time()
+        with self._lock:
+            row = self._db.execute('SELECT result, created FROM translations WHERE text=? AND source=? AND target=?', key).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._db.execute('DELETE FROM translations WHERE text=? AND source=? AND target=?', key)
+                row = None
+
+            if row is None:
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            self._db.execute('UPDATE translations SET accessed=? WHERE text=? AND source=? AND target=?', (now, *key))
+            return row[0]
+
+    def set(self, text, source, target, result):
+        now = time()
+        with self._lock:
+            self._db.execute('INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?, ?, ?)', (normalize(text), source, target, result, now, now))
+            if self.max_entries is not None:
+                self._db.execute(
+                    'DELETE FROM translations WHERE rowid IN '
+                    '(SELECT rowid FROM translations ORDER BY accessed DESC LIMIT -1 OFFSET ?)', (self.max_entries,)
+                )
+
+    def stats(self) -> dict:
+        with self._lock:
+            entries = self._db.execute('SELECT COUNT(*) FROM translations').fetchone()[0]
+        return {'hits': self.hits, 'misses': self.misses, 'entries': entries}
+
+    def clear(self):
+        with self._lock:
+            self._db.execute('DELETE FROM translations')
+        self.hits = self.misses = 0
+
+    def close(self):
+        self._db.close()
+
+def _cache(cache):
+    match cache:
+        case True:
+            return TranslationCache()
+        case False | None:
+            return None
+        case str() | os.PathLike():
+            return TranslationCache(os.fspath(cache))
+        case _:
+            return cache
+
+class Translator:
+    """
+    Cliente de traducción que reutiliza conexiones HTTP (keep-alive) y espacia los pedidos con un token bucket
+    (`rate` pedidos por segundo, ráfagas de hasta `burst`) en lugar de dormir antes de cada uno.
+    Los errores de conexión y las respuestas 429/5xx se reintentan hasta `retries` veces con backoff exponencial.
+    `base_url` es una plantilla con {target}, {source} y {text}; sirve para apuntar a otro servidor (por ejemplo, uno local de prueba).
+    Antes de pedir nada se consulta `cache`: True usa un `TranslationCache` en `CACHE_PATH`, una ruta usa otro archivo,
+    también se puede pasar un `TranslationCache` ya armado, y False lo desactiva.
+    """
+    def __init__(self,
+                 base_url: str = BASE_URL,
+                 rate: float = 1.5,
+                 burst: int = 1,
+                 max_connections: int = 4,
+                 retries: int = 3,
+                 backoff: float = 0.5,
+                 timeout: float = 10,
+                 headers: dict = agent,
+                 cache: 'bool | str | TranslationCache' = True):
+        self.base_url = base_url
+        self.cache = _cache(cache)
+        self.limiter = RateLimiter(rate, burst)
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.headers = headers
+        self._connections = LifoQueue(maxsize=max_connections)
+
+    def __repr__(self):
+        return f'Translator(base_url={self.base_url!r}, rate={self.limiter.rate}, max_connections={self.max_connections})'
+
+    def _checkout(self, key):
+        while True:
+            try:
+                connection_key, connection = self._connections.get_nowait()
+            except Empty:
+                scheme, netloc = key
+                Connection = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+                return Connection(netloc, timeout=self.timeout)
+            # El pool puede tener conexiones a otro host si cambió `base_url`.
+            if connection_key == key:
+                return connection
+            connection.close()
+
+    def _checkin(self, key, connection):
+        try:
+            self._connections.put_nowait((key, connection))
+        except Full:
+            connection.close()
+
+    def _get(self, url):
+        parts = urllib.parse.urlsplit(url)
+        target = parts.path + (f'?{parts.query}' if parts.query else '')
+        key = (parts.scheme, parts.netloc)
+
+        for attempt in range(self.retries + 1):
+            self.limiter.acquire()
+            connection = self._checkout(key)
+            try:
+                connection.request('GET', target, headers=self.headers)
+                response = connection.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                if attempt == self.retries:
+                    raise
+            else:
+                if response.will_close:
+                    connection.close()
+                else:
+                    self._checkin(key, connection)
+
+                if response.status < 400:
+                    return body
+                if response.status not in RETRY_STATUS or attempt == self.retries:
+                    raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+
+            sleep(self.backoff * 2 ** attempt * random.uniform(1, 1.5))
+
+    def _request(self, to_translate, to_language, from_language) -> str:
+        link = self.base_url.format(source=from_language,
+                                    target=to_language,
+                                    text=urllib.parse.quote(to_translate))
+        data = self._get(link).decode("utf-8")
+        re_result = CLASS_SELECTOR.findall(data)
+        return '' if not re_result else html.unescape(re_result[0])
+
+    def translate(self, to_translate, to_language='auto', from_language='auto') -> str:
+        if self.cache is None:
+            return self._request(to_translate, to_language, from_language)
+
+        result = self.cache.get(to_translate, from_language, to_language)
+        if result is None:
+            result = self._request(to_translate, to_language, from_language)
+            # Un resultado vacío suele ser una respuesta que no se pudo leer: no se guarda.
+            if result:
+                self.cache.set(to_translate, from_language, to_language, result)
+        return result
+
+    def translate_many(self, strs, to_language='auto', from_language='auto', **tqdm_kwargs) -> list[str]:
+        """
+        Traduce cada texto de `strs` en paralelo (hasta `max_connections` hilos); el ritmo lo sigue marcando el rate limiter.
+        Devuelve las traducciones en el mismo orden.
+        """
+        translate = partial(self.translate, to_language=to_language, from_language=from_language)
+        return Multithread.map(translate, strs, **({'max_workers': self.max_connections} | tqdm_kwargs))
+
+    def bulk(self, *strs,
+             input_lang='auto',
+             output_lang='auto',
+             delimiter=";\n") -> list[str]:
+        if self.cache is not None:
+            cached = [self.cache.get(x, output_lang, input_lang) for x in strs]
+            if None not in cached:
+                return cached
+
+        s = delimiter.join(strs)
+        o = self._request(s, to_language=input_lang, from_language=output_lang).split(delimiter)
+
+        # Sólo se puede guardar cada texto si la respuesta respetó los delimitadores.
+        if self.cache is not None and len(o) == len(strs):
+            for x, result in zip(strs, o):
+                if result:
+                    self.cache.set(x, output_lang, input_lang, result)
+        return o
+
+    def close(self):
+        if self.cache is not None:
+            self.cache.close()
+        while True:
+            try:
+                self._connections.get_nowait()[1].close()
+            except Empty:
+                return
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *_):
+        self.close()
+
+_default_client = None
+
+def default_client() -> Translator:
+    global _default_client
+    if _default_client is None:
+        _default_client = Translator()
+    return _default_client
+
+def configure(**kwargs) -> Translator:
+    """Reemplaza el cliente que usan `__call__`, `bulk` y `__translate__` por uno nuevo con estas opciones (ver `Translator`)."""
+    global _default_client
+    if _default_client is not None:
+        _default_client.close()
+    _default_client = Translator(**kwargs)
+    return _default_client
+
 def __translate__(to_translate, to_language='auto', from_language='auto'):
-    sleep(random.uniform(.5,.7))
-    to_translate = urllib.parse.quote(to_translate)
-    link = BASE_URL.format(source=from_language, 
-                            target=to_language, 
-                            text=to_translate)
-    # print(link)
-    request = urllib.request.Request(link, headers=agent)
-    raw_data = urllib.request.urlopen(request).read()
-    data = raw_data.decode("utf-8")
-    re_result = CLASS_SELECTOR.findall(data)
-    result = '' if not re_result else html.unescape(re_result[0])
-    return result
+    return default_client().translate(to_translate, to_language, from_language)
 
 def __call__(to_translate, to_language='auto', from_language='auto'):
     return __translate__(to_translate, to_language, from_language)
 
-def bulk(*strs, 
-        input_lang='auto', 
-        output_lang='auto', 
+def bulk(*strs,
+        input_lang='auto',
+        output_lang='auto',
         delimiter=";\n") -> list[str]:
-    
-    s = delimiter.join(strs)
-    o = __translate__(s, to_language=input_lang, from_language=output_lang)
-    return o.split(delimiter)
+
+    return default_client().bulk(*strs, input_lang=input_lang, output_lang=output_lang, delimiter=delimiter)
 
 import sys
 
@@ -53,4 +297,4 @@ class Module(sys.modules[__name__].__class__):
     def __call__(self, to_translate, to_language='auto', from_language='auto'):
         return __call__(to_translate, to_language, from_language)
 
-sys.modules[__name__].__class__ = Module
\ No newline at end of file
+sys.modules[__name__].__class__ = Module
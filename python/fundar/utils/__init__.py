@@ -1,5 +1,7 @@
 import io
 import os
+import mmap
+from contextlib import contextmanager
 from operator import contains
 from functools import reduce, partial
 from typing import NewType, Callable, TypeVar, Protocol, Generic, Optional
@@ -229,22 +231,129 @@ def map_value(value, istart, istop, ostart, ostop):
 
 # =============================================================================================
 
-def load_from_str_or_buf(input_data) -> io.BytesIO:
+MMAP_THRESHOLD = 64 << 20
+
+_MAGIC = {
+    b'\x1f\x8b': 'gzip',
+    b'BZh': 'bz2',
+    b'\x28\xb5\x2f\xfd': 'zstd',
+}
+
+def _head(buffer, n=4):
+    if hasattr(buffer, 'peek'):
+        return buffer.peek(n)[:n]
+    if buffer.seekable():
+        position = buffer.tell()
+        head = buffer.read(n)
+        buffer.seek(position)
+        return head
+    return b''
+
+def _compression(head):
+    return next((method for magic, method in _MAGIC.items() if head.startswith(magic)), None) if isinstance(head, bytes) else None
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Para leer .zst hace falta 'zstandard' (pip install zstandard).") from None
+    return zstandard
+
+def _open_compressed(path, method):
+    match method:
+        case 'gzip':
+            import gzip
+            return gzip.open(path, 'rb')
+        case 'bz2':
+            import bz2
+            return bz2.open(path, 'rb')
+        case 'zstd':
+            return _zstandard().open(path, 'rb')
+
+def _decompressed(buffer):
+    """Envuelve `buffer` en un descompresor si empieza con la firma de gzip, bz2 o zstd. Cerrarlo no cierra `buffer`."""
+    match _compression(_head(buffer)):
+        case 'gzip':
+            import gzip
+            return gzip.GzipFile(fileobj=buffer, mode='rb')
+        case 'bz2':
+            import bz2
+            return bz2.BZ2File(buffer, mode='rb')
+        case 'zstd':
+            return _zstandard().ZstdDecompressor().stream_reader(buffer, closefd=False)
+        case _:
+            return buffer
+
+def _open(input_data, mmap_threshold):
     match input_data:
-        case string if isinstance(input_data, str):
-            if not os.path.exists(input_data):
-                raise FileNotFoundError(f'File {string} not found.')
-            if not os.path.isfile(string):
+        case str() | os.PathLike():
+            path = os.fspath(input_data)
+            if not os.path.exists(path):
+                raise FileNotFoundError(f'File {path} not found.')
+            if not os.path.isfile(path):
                 raise ValueError("Input is a folder, not a file.")
-            
-            with open(string, 'rb') as file:
-                return io.BytesIO(file.read())
-            
-        case buffer if isinstance(input_data, (io.BytesIO, io.StringIO)):
-            return buffer
+
+            with open(path, 'rb') as file:
+                method = _compression(_head(file))
+                if method is None and mmap_threshold is not None and os.fstat(file.fileno()).st_size >= max(mmap_threshold, 1):
+                    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            return _open_compressed(path, method) if method else open(path, 'rb')
+
+        case bytes() | bytearray() | memoryview():
+            return _decompressed(io.BytesIO(input_data))
+
+        case buffer if hasattr(input_data, 'read'):
+            return buffer if isinstance(buffer, io.TextIOBase) else _decompressed(buffer)
+
         case _:
-            raise TypeError("Unsupported input type. Please provide a valid file path or buffer.")
-        
+            raise TypeError("Unsupported input type. Please provide a valid file path, bytes or buffer.")
+
+def _in_memory(buffer):
+    """`buffer` (binario) como BytesIO, descomprimido si empieza con la firma de gzip, bz2 o zstd."""
+    if _compression(_head(buffer)) is None:
+        return buffer if isinstance(buffer, io.BytesIO) else io.BytesIO(buffer.read())
+    with _decompressed(buffer) as f:
+        return io.BytesIO(f.read())
+
+def load_from_str_or_buf(input_data) -> io.BytesIO:
+    """
+    Devuelve el contenido de `input_data` en memoria, en un BytesIO que no hace falta cerrar.
+    Acepta una ruta (str o PathLike), bytes, bytearray, memoryview o un archivo o buffer abierto, que se lee desde
+    donde está y no se cierra. Un BytesIO sin comprimir o un StringIO se devuelve tal cual; otros archivos de texto, como StringIO.
+    Si el contenido está comprimido con gzip, bz2 o zstd (según su firma) se descomprime.
+    Para leer sin cargar todo en memoria, usar `open_str_or_buf`.
+    """
+    match input_data:
+        case io.StringIO():
+            return input_data
+        case io.TextIOBase():
+            return io.StringIO(input_data.read())
+        case bytes() | bytearray() | memoryview():
+            return _in_memory(io.BytesIO(input_data))
+        case str() | os.PathLike():
+            with open_str_or_buf(input_data, mmap_threshold=None) as f:
+                return io.BytesIO(f.read())
+        case _ if hasattr(input_data, 'read'):
+            return _in_memory(input_data)
+        case _:
+            raise TypeError("Unsupported input type. Please provide a valid file path, bytes or buffer.")
+
+@contextmanager
+def open_str_or_buf(input_data, mmap_threshold: int = MMAP_THRESHOLD):
+    """
+    Abre `input_data` para leerlo y al salir cierra lo que abrió (pero no el buffer que se le pasó):
+    - una ruta (str o PathLike) se abre en binario, sin leerla entera; si pesa al menos `mmap_threshold` bytes se mapea en memoria;
+    - bytes, bytearray o memoryview se envuelven en un BytesIO;
+    - un buffer o archivo abierto se usa tal cual.
+    Si el contenido está comprimido con gzip, bz2 o zstd (según su firma) se descomprime al vuelo.
+    """
+    buffer = _open(input_data, mmap_threshold)
+    try:
+        yield buffer
+    finally:
+        if buffer is not input_data:
+            buffer.close()
+
 # =============================================================================================
 
 def apply(f):